@@ -0,0 +1,251 @@
+import json
+import os
+import socket
+import struct
+import tempfile
+import time
+
+from app.config import ENCRYPTION_SALT_SETTING, KDF_PARAMS_SETTING, WRAPPED_KEY_SETTING
+
+# Agente de desbloqueo (al estilo ssh-agent): mantiene la bóveda abierta en
+# memoria detrás de un socket Unix, así las consultas repetidas del CLI cuestan
+# un round-trip y no una derivación de clave. El lado cliente no importa
+# cryptography ni la DB, para que cada consulta arranque rápido. Opcional: se inicia con
+# "python cli.py agent" y se detiene con "python cli.py lock" o por inactividad.
+SOCKET_ENV = "PASSTORE_AGENT_SOCK"
+DEFAULT_IDLE_TIMEOUT = 15 * 60  # segundos
+ACCEPT_POLL_SECONDS = 1.0
+MAX_REQUEST_BYTES = 64 * 1024
+
+# Settings que cambian si se cambia la contraseña o la clave de datos
+KEY_SETTINGS = (ENCRYPTION_SALT_SETTING, KDF_PARAMS_SETTING, WRAPPED_KEY_SETTING)
+
+
+def is_supported():
+    return hasattr(socket, "AF_UNIX")
+
+
+def default_socket_path():
+    """$PASSTORE_AGENT_SOCK, else a per-user directory (0700) under XDG_RUNTIME_DIR or the temp dir."""
+    path = os.environ.get(SOCKET_ENV)
+    if path:
+        return path
+    base = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    return os.path.join(base, f"passtore-{os.getuid()}", "agent.sock")
+
+
+def peer_uid(conn):
+    """Uid of the process at the other end of a Unix socket, or None if the OS does not tell."""
+    if not hasattr(socket, "SO_PEERCRED"):
+        return None
+    creds = conn.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+    _, uid, _ = struct.unpack("3i", creds)
+    return uid
+
+
+class UnlockAgent:
+    """
+    Serves lookups from an unlocked Vault over a Unix-domain socket.
+
+    One JSON request per connection and one JSON response. Only processes of
+    the same user are served: the socket lives in a 0700 directory, is 0600,
+    and the peer uid is checked with SO_PEERCRED where available. The agent
+    exits after idle_timeout seconds without requests, on a "lock" request,
+    or when the vault's key settings change (master password changed).
+    """
+
+    def __init__(self, vault, path=None, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+        self.vault = vault
+        self.path = path or default_socket_path()
+        self.idle_timeout = idle_timeout
+        self.db_path = os.path.abspath(vault.db.db_name)
+        self._key_settings = self._read_key_settings()
+        self._data_version = self._read_data_version()
+        self._running = False
+
+    def serve_forever(self):
+        server = self._bind()
+        self._running = True
+        last_request = time.monotonic()
+        try:
+            while self._running:
+                if time.monotonic() - last_request > self.idle_timeout:
+                    break
+                try:
+                    conn, _ = server.accept()
+                except socket.timeout:
+                    continue
+                with conn:
+                    self._handle(conn)
+                last_request = time.monotonic()
+        finally:
+            server.close()
+            self._unlink()
+
+    def _bind(self):
+        directory = os.path.dirname(self.path)
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        if os.stat(directory).st_uid != os.getuid():
+            raise ValueError(f"Agent directory is owned by another user: {directory}")
+        os.chmod(directory, 0o700)
+        if os.path.exists(self.path):
+            if AgentClient(self.path).is_running():
+                raise ValueError(f"An agent is already running on {self.path}")
+            os.unlink(self.path)  # stale socket from a crashed agent
+
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        old_umask = os.umask(0o177)
+        try:
+            server.bind(self.path)
+        finally:
+            os.umask(old_umask)
+        server.listen(8)
+        server.settimeout(ACCEPT_POLL_SECONDS)
+        return server
+
+    def _unlink(self):
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+    def _handle(self, conn):
+        conn.settimeout(5)
+        uid = peer_uid(conn)
+        if uid is not None and uid != os.getuid():
+            return  # other users get nothing, not even an error
+        try:
+            request = json.loads(_read_line(conn, MAX_REQUEST_BYTES))
+            response = {"ok": True, "result": self._dispatch(request)}
+        except Exception as e:
+            response = {"ok": False, "error": str(e)}
+        try:
+            conn.sendall(json.dumps(response, ensure_ascii=False).encode() + b"\n")
+        except OSError:
+            pass
+
+    def _dispatch(self, request):
+        op = request.get("op")
+        if op == "ping":
+            return {"db": self.db_path, "pid": os.getpid()}
+        if op == "lock":
+            self._running = False
+            return None
+        if request.get("db") and os.path.abspath(request["db"]) != self.db_path:
+            raise ValueError(f"Agent serves another vault: {self.db_path}")
+
+        if self._read_key_settings() != self._key_settings:
+            # Password or data key changed elsewhere: require a new unlock
+            self._running = False
+            raise ValueError("Vault key changed; agent locked")
+        self._refresh_cache()
+
+        vault = self.vault
+        if op == "tabs":
+            return vault.tabs()
+        if op == "list":
+            return vault.list(request["tab"], reveal=request.get("reveal", False))
+        if op == "get":
+            return vault.get(int(request["id"]), reveal=request.get("reveal", True))
+        if op == "search":
+            return vault.search(request["query"], limit=request.get("limit", 100), reveal=request.get("reveal", False))
+        if op == "decrypt":
+            return vault.encryption_manager.decrypt(request["token"])
+        raise ValueError(f"Unknown operation: {op}")
+
+    def _refresh_cache(self):
+        """Drop the decrypted tab cache if another connection committed since the last request."""
+        version = self._read_data_version()
+        if version != self._data_version:
+            self.vault.db._invalidate_cache()
+            self._data_version = version
+
+    def _read_data_version(self):
+        cursor = self.vault.db.get_connection().execute("PRAGMA data_version")
+        return cursor.fetchone()[0]
+
+    def _read_key_settings(self):
+        return tuple(self.vault.db.get_setting(key) for key in KEY_SETTINGS)
+
+
+class AgentClient:
+    """Client side of UnlockAgent; connection errors surface as OSError."""
+
+    def __init__(self, path=None, timeout=10):
+        self.path = path or default_socket_path()
+        self.timeout = timeout
+
+    def request(self, op, **params):
+        """
+        Send one request and return its result.
+
+        Raises:
+            OSError: If no agent is listening
+            ValueError: If the agent rejected the request
+        """
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+            conn.settimeout(self.timeout)
+            conn.connect(self.path)
+            conn.sendall(json.dumps({"op": op, **params}).encode() + b"\n")
+            line = _read_line(conn)
+        if not line:
+            raise ConnectionError("Agent closed the connection")
+        response = json.loads(line)
+        if not response["ok"]:
+            raise ValueError(response["error"])
+        return response["result"]
+
+    def is_running(self):
+        if not is_supported() or not os.path.exists(self.path):
+            return False
+        try:
+            self.request("ping")
+        except (OSError, ValueError):
+            return False
+        return True
+
+
+class AgentVault:
+    """Read-only Vault look-alike that forwards lookups to a running agent."""
+
+    def __init__(self, client, db_name):
+        self.client = client
+        self.db_name = os.path.abspath(db_name)
+
+    def tabs(self):
+        return self.client.request("tabs", db=self.db_name)
+
+    def list(self, tab, reveal=False):
+        return self.client.request("list", db=self.db_name, tab=tab, reveal=reveal)
+
+    def get(self, record_id, reveal=True):
+        return self.client.request("get", db=self.db_name, id=record_id, reveal=reveal)
+
+    def search(self, query, limit=100, reveal=False):
+        return self.client.request("search", db=self.db_name, query=query, limit=limit, reveal=reveal)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _read_line(conn, limit=None):
+    """Read up to the newline that ends a message (requests are capped at limit bytes)."""
+    chunks = []
+    size = 0
+    while True:
+        chunk = conn.recv(65536)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        size += len(chunk)
+        if chunk.endswith(b"\n"):
+            break
+        if limit is not None and size > limit:
+            raise ValueError("Request too large")
+    return b"".join(chunks).decode()
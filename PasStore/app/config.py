@@ -23,6 +23,20 @@ THEMES = {
     }
 }
 
+# Campos de una credencial, en el orden de la tabla credenciales (sin id, row_color ni tab_id)
+FIELD_NAMES = ("detalle", "tipo_acceso", "acceso_host", "puerto", "usuario", "password",
+               "rol", "contiene", "instancia_tipo", "ip_priv", "ip_pub")
+
+# Settings con el material de clave de la bóveda (ver app/utils/security.py).
+# Están acá para poder consultarlos sin importar cryptography (login, agente)
+ENCRYPTION_SALT_SETTING = "encryption_salt"
+KDF_PARAMS_SETTING = "kdf_params"
+WRAPPED_KEY_SETTING = "wrapped_data_key"
+KEY_CHECK_SETTING = "key_check"
+MASTER_HASH_SETTING = "master_hash"
+# Cualquiera de estos indica que la bóveda ya tiene contraseña maestra
+MASTER_PASSWORD_SETTINGS = (WRAPPED_KEY_SETTING, KEY_CHECK_SETTING, MASTER_HASH_SETTING)
+
 # Determinamos el directorio base del proyecto
 if getattr(sys, 'frozen', False):
     # Si es un ejecutable (PyInstaller)
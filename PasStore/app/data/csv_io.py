@@ -0,0 +1,94 @@
+import csv
+import time
+
+# Formato del CSV (igual al de exportación)
+CSV_HEADERS = ["Pestaña", "Detalle / SID", "Tipo acceso", "HOST / IP / DNS", "Puerto", "User", "Pass", "Rol", "Contiene", "Instancia / Tipo", "IP Priv", "IP Pub"]
+DATA_FIELDS = 11
+
+
+def iter_csv_records(file, default_tab_name):
+    """
+    Stream (tab_name, data) records from an open CSV file.
+    
+    Args:
+        file: Open text file in the export format (first column "Pestaña")
+        default_tab_name (str): Tab used for headerless 11-column rows
+        
+    Yields:
+        tuple: (tab_name, data) where data holds exactly 11 fields
+    """
+    reader = csv.reader(file)
+    header = next(reader, None)
+    if not header:
+        return
+
+    # Check if first column is "Pestaña"
+    has_tab_col = header[0].lower() == "pestaña" or header[0].lower() == "tab"
+
+    for row in reader:
+        if not row:
+            continue
+
+        if has_tab_col or len(row) != DATA_FIELDS:
+            tab_name = row[0]
+            file_data = row[1:]
+        else:
+            # Only data columns: use the current tab
+            tab_name = default_tab_name
+            file_data = row
+
+        # Ensure we have 11 fields
+        if len(file_data) < DATA_FIELDS:
+            file_data = file_data + ([""] * (DATA_FIELDS - len(file_data)))
+        elif len(file_data) > DATA_FIELDS:
+            file_data = file_data[:DATA_FIELDS]
+
+        yield tab_name, tuple(file_data)
+
+
+def import_csv(db, filename, encryption_manager=None, default_tab_name="Principal", progress=None):
+    """
+    Import a CSV file into the database in a single bulk transaction.
+    
+    Args:
+        progress: Optional callable(imported_rows) invoked after each batch
+    
+    Returns:
+        tuple: (imported_rows, rows_per_second)
+    """
+    start = time.perf_counter()
+    with open(filename, mode='r', newline='', encoding='utf-8') as file:
+        count = db.bulk_add_credentials(iter_csv_records(file, default_tab_name), encryption_manager, progress=progress)
+    elapsed = time.perf_counter() - start
+    rate = count / elapsed if elapsed > 0 else 0.0
+    return count, rate
+
+
+def export_csv(db, filename, encryption_manager=None, progress=None, chunk_size=500):
+    """
+    Export every tab to CSV, streaming rows chunk by chunk so memory stays flat.
+    
+    Args:
+        db: DatabaseManager instance
+        filename (str): Destination path
+        encryption_manager: Optional EncryptionManager used to decrypt rows
+        progress: Optional callable(done, total) invoked after each chunk
+        chunk_size (int): Rows read and decrypted per step
+        
+    Returns:
+        int: Number of exported rows
+    """
+    total = db.count_credentials()
+    done = 0
+    with open(filename, mode='w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(CSV_HEADERS)
+
+        for tab_id, tab_name, _ in db.get_tabs():
+            for chunk in db.iter_credentials(tab_id, encryption_manager, chunk_size):
+                # TabName + data fields (skipping ID and row_color)
+                writer.writerows([tab_name, *row[1:DATA_FIELDS + 1]] for row in chunk)
+                done += len(chunk)
+                if progress:
+                    progress(done, total)
+    return done
@@ -1,18 +1,121 @@
 import sqlite3
+import threading
+import time
 from app.config import DB_NAME
 
+# Tamaño de la caché de sentencias preparadas de cada conexión
+STATEMENT_CACHE_SIZE = 256
+
+# Filas por transacción en las migraciones por lotes
+MIGRATION_BATCH_SIZE = 500
+# Separación entre claves de orden (display_order / position): deja lugar para
+# insertar filas entre dos vecinas con una sola escritura
+ORDER_GAP = 1024
+
+# Formatos de almacenamiento de las credenciales encriptadas
+STORAGE_FIELDS = "fields"   # un token Fernet por campo
+STORAGE_SEALED = "sealed"   # todos los campos en un único token (columna sealed)
+
+INSERT_CREDENTIAL_QUERY = "INSERT INTO credenciales (detalle, tipo_acceso, acceso_host, puerto, usuario, password, rol, contiene, instancia_tipo, ip_priv, ip_pub, sealed, tab_id, display_order) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+CREDENTIALS_BY_TAB_QUERY = "SELECT id, detalle, tipo_acceso, acceso_host, puerto, usuario, password, rol, contiene, instancia_tipo, ip_priv, ip_pub, row_color, sealed FROM credenciales WHERE tab_id = ? ORDER BY display_order ASC, id ASC"
+MAX_ORDER_QUERY = "SELECT MAX(display_order) FROM credenciales WHERE tab_id = ?"
+# Vecino anterior/siguiente de un registro en su pestaña: (id, display_order, display_order del registro)
+PREV_ENTRY_QUERY = "SELECT n.id, n.display_order, c.display_order FROM credenciales c JOIN credenciales n ON n.tab_id = c.tab_id AND n.display_order < c.display_order WHERE c.id = ? ORDER BY n.display_order DESC LIMIT 1"
+NEXT_ENTRY_QUERY = "SELECT n.id, n.display_order, c.display_order FROM credenciales c JOIN credenciales n ON n.tab_id = c.tab_id AND n.display_order > c.display_order WHERE c.id = ? ORDER BY n.display_order ASC LIMIT 1"
+COUNT_BY_TAB_QUERY = "SELECT COUNT(*) FROM credenciales WHERE tab_id = ?"
+
+# Migraciones versionadas (PRAGMA user_version), en orden:
+# (versión, método de DatabaseManager, backfill por lotes)
+SCHEMA_MIGRATIONS = [
+    (1, "_migrate_base_schema", False),
+    (2, "_backfill_display_order", True),
+    (3, "_create_tab_order_index", False),
+    (4, "_spread_order_keys", True),
+]
+SCHEMA_VERSION = SCHEMA_MIGRATIONS[-1][0]
+
+# Consultas frecuentes y si deben resolverse solo con el índice (covering);
+# check_query_plans verifica que ninguna recorra la tabla ni ordene aparte
+HOT_QUERIES = [
+    ("credentials_by_tab", CREDENTIALS_BY_TAB_QUERY, (1,), False),
+    ("max_order", MAX_ORDER_QUERY, (1,), True),
+    ("prev_entry", PREV_ENTRY_QUERY, (1,), True),
+    ("next_entry", NEXT_ENTRY_QUERY, (1,), True),
+    ("count_by_tab", COUNT_BY_TAB_QUERY, (1,), True),
+]
+
 class DatabaseManager:
     def __init__(self, db_name=DB_NAME):
         self.db_name = db_name
+        # One long-lived connection per thread (sqlite3 objects are not shareable across threads)
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        # Decrypted rows per tab: tab_id -> (encryption_manager, rows, {record_id: row})
+        self._credential_cache = {}
 
     def get_connection(self):
-        return sqlite3.connect(self.db_name)
+        """Return the persistent connection for the calling thread, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._open_connection()
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def _open_connection(self):
+        # check_same_thread=False only so close() can run from the owner of the manager;
+        # each connection is still used exclusively by the thread that opened it.
+        conn = sqlite3.connect(self.db_name, cached_statements=STATEMENT_CACHE_SIZE, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def close(self):
+        """Close every connection opened by this manager."""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+        self._credential_cache.clear()
 
     def init_db(self):
+        """
+        Bring the schema up to SCHEMA_VERSION.
+        
+        The schema version lives in PRAGMA user_version: when it is current,
+        startup costs that single read. Otherwise the pending SCHEMA_MIGRATIONS
+        run in order, each one in its own transaction together with the
+        version bump, so an interrupted upgrade resumes at the failed step.
+        """
         conn = self.get_connection()
-        cursor = conn.cursor()
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version >= SCHEMA_VERSION:
+            return
         
-        # 1. Base table
+        for target, step_name, batched in SCHEMA_MIGRATIONS:
+            if target <= version:
+                continue
+            step = getattr(self, step_name)
+            if batched:
+                # Idempotent backfill committed batch by batch
+                step(conn)
+                with conn:
+                    conn.execute(f"PRAGMA user_version = {int(target)}")
+                continue
+            conn.execute("BEGIN")
+            try:
+                step(conn.cursor())
+                conn.execute(f"PRAGMA user_version = {int(target)}")
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+
+    def _migrate_base_schema(self, cursor):
+        """Version 1: tables and columns. Unversioned databases may be at any older layout."""
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS credenciales (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -46,32 +149,22 @@ class DatabaseManager:
             )
         ''')
 
-        # 2. Migrations
+        # Columns added over time
         cursor.execute("PRAGMA table_info(credenciales)")
         existing_cols = [info[1] for info in cursor.fetchall()]
-        
-        if "tipo_acceso" not in existing_cols:
-            cursor.execute("ALTER TABLE credenciales ADD COLUMN tipo_acceso TEXT")
-            
-        if "contiene" not in existing_cols:
-            cursor.execute("ALTER TABLE credenciales ADD COLUMN contiene TEXT")
-
-        if "tab_id" not in existing_cols:
-            cursor.execute("ALTER TABLE credenciales ADD COLUMN tab_id INTEGER DEFAULT 1")
-
-        if "ip_priv" not in existing_cols:
-            cursor.execute("ALTER TABLE credenciales ADD COLUMN ip_priv TEXT")
-            
-        if "rol" not in existing_cols:
-            cursor.execute("ALTER TABLE credenciales ADD COLUMN rol TEXT")
-            
-        if "row_color" not in existing_cols:
-            cursor.execute("ALTER TABLE credenciales ADD COLUMN row_color TEXT")
-        
-        if "display_order" not in existing_cols:
-            cursor.execute("ALTER TABLE credenciales ADD COLUMN display_order INTEGER DEFAULT 0")
-            # Set initial order based on current ID
-            cursor.execute("UPDATE credenciales SET display_order = id WHERE display_order IS NULL OR display_order = 0")
+        new_cols = [
+            ("tipo_acceso", "TEXT"),
+            ("contiene", "TEXT"),
+            ("tab_id", "INTEGER DEFAULT 1"),
+            ("ip_priv", "TEXT"),
+            ("rol", "TEXT"),
+            ("row_color", "TEXT"),
+            ("sealed", "TEXT"),
+            ("display_order", "INTEGER DEFAULT 0"),  # filled by _backfill_display_order
+        ]
+        for name, col_type in new_cols:
+            if name not in existing_cols:
+                cursor.execute(f"ALTER TABLE credenciales ADD COLUMN {name} {col_type}")
             
         # Tabs migration
         cursor.execute("PRAGMA table_info(tabs)")
@@ -85,8 +178,47 @@ class DatabaseManager:
             cursor.execute("INSERT INTO tabs (name, color, position) VALUES (?, ?, ?)", ("Principal", "#e0e0e0", 0))
             cursor.execute("UPDATE credenciales SET tab_id = 1 WHERE tab_id IS NULL")
 
-        conn.commit()
-        conn.close()
+    def _backfill_display_order(self, conn, batch_size=MIGRATION_BATCH_SIZE):
+        """Version 2: initial order based on the id, for rows from before display_order."""
+        max_id = conn.execute("SELECT MAX(id) FROM credenciales").fetchone()[0] or 0
+        # Walk the primary key in ranges so each batch is a short write transaction
+        for start in range(0, max_id, batch_size):
+            with conn:
+                conn.execute("UPDATE credenciales SET display_order = id WHERE id > ? AND id <= ? AND (display_order IS NULL OR display_order = 0)",
+                             (start, start + batch_size))
+
+    def _create_tab_order_index(self, cursor):
+        """Version 3: index for per-tab listing and ordering (see HOT_QUERIES)."""
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_credenciales_tab_order ON credenciales (tab_id, display_order, id)")
+
+    def _spread_order_keys(self, conn):
+        """Version 4: renumber rows and tabs ORDER_GAP apart (one transaction per tab)."""
+        tab_ids = [row[0] for row in conn.execute("SELECT DISTINCT tab_id FROM credenciales")]
+        for tab_id in tab_ids:
+            with conn:
+                self._rebalance_order(conn.cursor(), tab_id)
+        with conn:
+            self._rebalance_tabs(conn.cursor())
+
+    def check_query_plans(self):
+        """
+        Run EXPLAIN QUERY PLAN on HOT_QUERIES and report the ones that lost their index.
+        
+        A query fails if it scans a table or index, sorts with a temporary b-tree,
+        or (when marked covering) needs to read the table rows.
+        
+        Returns:
+            list: (name, plan) tuples for the failing queries; empty if all is well
+        """
+        conn = self.get_connection()
+        failures = []
+        for name, query, params, covering in HOT_QUERIES:
+            plan = " | ".join(row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}", params))
+            ok = ("SCAN " not in plan and "TEMP B-TREE" not in plan
+                  and (not covering or "COVERING INDEX" in plan))
+            if not ok:
+                failures.append((name, plan))
+        return failures
 
     def get_tabs(self):
         with self.get_connection() as conn:
@@ -107,25 +239,62 @@ class DatabaseManager:
             cursor.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", (key, value))
             conn.commit()
 
+    def set_settings(self, values):
+        """Write several settings in one transaction (all or nothing); a None value deletes the key."""
+        with self.get_connection() as conn:
+            self._write_settings(conn.cursor(), values)
+
+    def _write_settings(self, cursor, values):
+        for key, value in values.items():
+            if value is None:
+                cursor.execute("DELETE FROM settings WHERE key = ?", (key,))
+            else:
+                cursor.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", (key, value))
+
     def add_tab(self, name, color):
         with self.get_connection() as conn:
             cursor = conn.cursor()
             # Get max position
             cursor.execute("SELECT MAX(position) FROM tabs")
             res = cursor.fetchone()
-            max_pos = res[0] if res[0] is not None else -1
-            new_pos = max_pos + 1
+            new_pos = (res[0] if res[0] is not None else 0) + ORDER_GAP
             
             cursor.execute("INSERT INTO tabs (name, color, position) VALUES (?, ?, ?)", (name, color, new_pos))
             conn.commit()
 
-    def update_tab_order(self, tab_ids):
-        # tab_ids list of ints in order
+    def move_tab(self, tab_id, position):
+        """
+        Move a tab to index `position` among the other tabs with a single-row write.
+        
+        Returns:
+            bool: False if the tab does not exist
+        """
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            for index, tab_id in enumerate(tab_ids):
-                cursor.execute("UPDATE tabs SET position = ? WHERE id = ?", (index, tab_id))
-            conn.commit()
+            # Tabs are few: read them all, write only the moved one
+            cursor.execute("SELECT id, position FROM tabs ORDER BY position ASC, id ASC")
+            tabs = cursor.fetchall()
+            others = [row for row in tabs if row[0] != tab_id]
+            if len(others) == len(tabs):
+                return False
+            position = max(0, min(position, len(others)))
+            keys = self._keys_between(others[position - 1][1] if position > 0 else None,
+                                      others[position][1] if position < len(others) else None, 1)
+            if keys is None:
+                # No free key between the neighbours: renumber, leaving room at position
+                self._rebalance_tabs(cursor, skip_id=tab_id, hole_at=position)
+                cursor.execute("SELECT position FROM tabs WHERE id != ? ORDER BY position ASC, id ASC", (tab_id,))
+                positions = [row[0] for row in cursor.fetchall()]
+                keys = self._keys_between(positions[position - 1] if position > 0 else None,
+                                          positions[position] if position < len(positions) else None, 1)
+            cursor.execute("UPDATE tabs SET position = ? WHERE id = ?", (keys[0], tab_id))
+            return True
+
+    def _rebalance_tabs(self, cursor, skip_id=None, hole_at=None):
+        """Renumber tab positions ORDER_GAP apart, optionally leaving a free slot before index hole_at."""
+        cursor.execute("SELECT id FROM tabs ORDER BY position ASC, id ASC")
+        tab_ids = [row[0] for row in cursor.fetchall() if row[0] != skip_id]
+        cursor.executemany("UPDATE tabs SET position = ? WHERE id = ?", self._spread_keys(tab_ids, hole_at, 1))
 
     def rename_tab(self, tab_id, new_name):
         with self.get_connection() as conn:
@@ -139,51 +308,158 @@ class DatabaseManager:
             cursor.execute("UPDATE tabs SET color = ? WHERE id = ?", (new_color, tab_id))
             conn.commit()
 
+    def get_storage_format(self):
+        """Return how encrypted credentials are stored: STORAGE_FIELDS or STORAGE_SEALED."""
+        return self.get_setting("storage_format", STORAGE_FIELDS)
+
+    def set_storage_format(self, storage_format):
+        """Select the storage format; existing rows are converted by migrate_to_encrypted."""
+        if storage_format not in (STORAGE_FIELDS, STORAGE_SEALED):
+            raise ValueError(f"Unknown storage format: {storage_format}")
+        self.set_setting("storage_format", storage_format)
+
+    def _encrypt_fields(self, fields, encryption_manager, sealed=None):
+        """
+        Turn the 11 plaintext fields into the values stored in the DB.
+        
+        Returns:
+            tuple: 11 column values followed by the sealed column value
+        """
+        if not encryption_manager:
+            return (*fields, None)
+        if sealed is None:
+            sealed = self.get_storage_format() == STORAGE_SEALED
+        if sealed:
+            return (*([None] * len(fields)), encryption_manager.seal_credential(fields))
+        # encrypt_credential expects a trailing tab_id
+        return (*encryption_manager.encrypt_credential((*fields, None))[:-1], None)
+
     def add_credential(self, data, encryption_manager=None):
-        """Add a new credential, encrypting data if encryption_manager is provided."""
+        """Add a new credential, encrypting data if encryption_manager is provided. Returns the new id."""
+        tab_id = data[-1]  # Last element is tab_id
         # Encrypt data if encryption manager is provided
-        if encryption_manager:
-            data = encryption_manager.encrypt_credential(data)
+        values = self._encrypt_fields(data[:-1], encryption_manager)
         
         with self.get_connection() as conn:
             cursor = conn.cursor()
             # Get max display_order for this tab
-            tab_id = data[-1]  # Last element is tab_id
-            cursor.execute("SELECT MAX(display_order) FROM credenciales WHERE tab_id = ?", (tab_id,))
+            cursor.execute(MAX_ORDER_QUERY, (tab_id,))
             res = cursor.fetchone()
             max_order = res[0] if res[0] is not None else 0
-            new_order = max_order + 1
+            new_order = max_order + ORDER_GAP
             
-            cursor.execute('''
-                INSERT INTO credenciales (detalle, tipo_acceso, acceso_host, puerto, usuario, password, rol, contiene, instancia_tipo, ip_priv, ip_pub, tab_id, display_order)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (*data, new_order))
+            cursor.execute(INSERT_CREDENTIAL_QUERY, (*values, tab_id, new_order))
+            record_id = cursor.lastrowid
             conn.commit()
+        
+        # New rows go last in the tab: append to the cached tab instead of dropping it.
+        # The cached row is built from the stored ciphertext, never from `data`
+        cached = self._credential_cache.get(tab_id)
+        if cached and cached[0] is encryption_manager:
+            row = encryption_manager.lazy_rows([(record_id, *values[:-1], None, values[-1])])[0]
+            cached[1].append(row)
+            cached[2][record_id] = row
+        else:
+            self._invalidate_cache(tab_id)
+        return record_id
+
+    def bulk_add_credentials(self, records, encryption_manager=None, batch_size=1000, progress=None):
+        """
+        Insert many credentials in a single transaction.
+        
+        Args:
+            records: Iterable of (tab_name, data) where data holds the 11 credential fields
+                (detalle ... ip_pub). Consumed lazily, so it can be a generator over a file.
+            encryption_manager: Optional EncryptionManager used to encrypt each row
+            batch_size (int): Rows buffered per executemany call
+            progress: Optional callable(inserted_rows) invoked after each batch
+            
+        Returns:
+            int: Number of inserted rows
+        """
+        conn = self.get_connection()
+        count = 0
+        with conn:
+            cursor = conn.cursor()
+            # Resolve tabs once; new tabs are created inside the same transaction
+            cursor.execute("SELECT id, name FROM tabs ORDER BY position ASC, id ASC")
+            tab_ids = {}
+            for tab_id, name in cursor.fetchall():
+                tab_ids[name] = tab_id
+            cursor.execute("SELECT MAX(position) FROM tabs")
+            res = cursor.fetchone()
+            next_pos = (res[0] if res[0] is not None else 0) + ORDER_GAP
+            # display_order is tracked in memory per tab
+            next_order = {}
+            sealed = self.get_storage_format() == STORAGE_SEALED
+            
+            batch = []
+            for tab_name, data in records:
+                tab_id = tab_ids.get(tab_name)
+                if tab_id is None:
+                    cursor.execute("INSERT INTO tabs (name, color, position) VALUES (?, ?, ?)", (tab_name, "#E0E0E0", next_pos))
+                    tab_id = cursor.lastrowid
+                    tab_ids[tab_name] = tab_id
+                    next_pos += ORDER_GAP
+                
+                if tab_id not in next_order:
+                    cursor.execute(MAX_ORDER_QUERY, (tab_id,))
+                    res = cursor.fetchone()
+                    next_order[tab_id] = (res[0] if res[0] is not None else 0) + ORDER_GAP
+                order = next_order[tab_id]
+                next_order[tab_id] = order + ORDER_GAP
+                
+                values = self._encrypt_fields(data, encryption_manager, sealed)
+                batch.append((*values, tab_id, order))
+                
+                if len(batch) >= batch_size:
+                    self._insert_credentials(cursor, batch)
+                    count += len(batch)
+                    batch = []
+                    if progress:
+                        progress(count)
+            
+            if batch:
+                self._insert_credentials(cursor, batch)
+                count += len(batch)
+        self._invalidate_cache()
+        return count
+
+    def _insert_credentials(self, cursor, rows):
+        cursor.executemany(INSERT_CREDENTIAL_QUERY, rows)
+
+    def _update_credentials(self, cursor, rows):
+        cursor.executemany('''
+            UPDATE credenciales 
+            SET detalle=?, tipo_acceso=?, acceso_host=?, puerto=?, usuario=?, password=?, rol=?, contiene=?, instancia_tipo=?, ip_priv=?, ip_pub=?, sealed=?
+            WHERE id=?
+        ''', rows)
 
     def update_credential(self, record_id, data, encryption_manager=None):
         """Update a credential, encrypting data if encryption_manager is provided."""
         # Encrypt data if encryption manager is provided
-        if encryption_manager:
-            # Add a dummy value for tab_id since encrypt_credential expects it
-            data_with_tab = (*data, None)
-            encrypted = encryption_manager.encrypt_credential(data_with_tab)
-            # Remove the dummy tab_id
-            data = encrypted[:-1]
+        values = self._encrypt_fields(data, encryption_manager)
         
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute('''
-                UPDATE credenciales 
-                SET detalle=?, tipo_acceso=?, acceso_host=?, puerto=?, usuario=?, password=?, rol=?, contiene=?, instancia_tipo=?, ip_priv=?, ip_pub=?
-                WHERE id=?
-            ''', (*data, record_id))
+            self._update_credentials(cursor, [(*values, record_id)])
             conn.commit()
+        if not encryption_manager:
+            # Only decrypted tabs are cached
+            self._invalidate_cache()
+            return
+        # Like add_credential: the cached row keeps the ciphertext, not `data`
+        self._patch_cached_record(
+            record_id,
+            lambda old: encryption_manager.lazy_rows([(old[0], *values[:-1], old[12], values[-1])])[0],
+            encryption_manager)
 
     def delete_credential(self, record_id):
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("DELETE FROM credenciales WHERE id=? ", (record_id,))
             conn.commit()
+        self._patch_cached_record(record_id, None)
     
     def update_row_color(self, record_id, color):
         """Update the color marking for a specific row."""
@@ -191,6 +467,7 @@ class DatabaseManager:
             cursor = conn.cursor()
             cursor.execute("UPDATE credenciales SET row_color=? WHERE id=? ", (color, record_id))
             conn.commit()
+        self._patch_cached_record(record_id, lambda old: old.with_color(color) if hasattr(old, "with_color") else (*old[:12], color))
 
     def delete_tab(self, tab_id):
         with self.get_connection() as conn:
@@ -200,23 +477,177 @@ class DatabaseManager:
             # Delete tab
             cursor.execute("DELETE FROM tabs WHERE id=?", (tab_id,))
             conn.commit()
+        self._invalidate_cache(tab_id)
 
     def get_credentials(self, tab_id, encryption_manager=None):
-        """Get credentials for a tab, decrypting data if encryption_manager is provided."""
+        """
+        Get credentials for a tab, decrypting data if encryption_manager is provided.
+        
+        With a manager the rows are LazyRecord objects: each field is decrypted
+        the first time it is read. Tabs are cached until one of the write
+        methods touches them; the cached list is patched in place by those
+        methods, so callers get a copy of it.
+        """
+        if encryption_manager:
+            return list(self._cached_tab(tab_id, encryption_manager)[1])
+        return self._read_tab(tab_id, None)
+
+    def get_credential(self, record_id, tab_id, encryption_manager):
+        """Get one decrypted credential of a tab by id (dictionary lookup on the tab cache)."""
+        try:
+            record_id = int(record_id)
+        except (TypeError, ValueError):
+            return None
+        return self._cached_tab(tab_id, encryption_manager)[2].get(record_id)
+
+    def _cached_tab(self, tab_id, encryption_manager):
+        """Cache entry (manager, rows, rows by id) of a tab, read from disk on a miss."""
+        cached = self._credential_cache.get(tab_id)
+        if not cached or cached[0] is not encryption_manager:
+            rows = self._read_tab(tab_id, encryption_manager)
+            cached = self._credential_cache[tab_id] = (encryption_manager, rows, {row[0]: row for row in rows})
+        return cached
+
+    def _read_tab(self, tab_id, encryption_manager):
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("SELECT id, detalle, tipo_acceso, acceso_host, puerto, usuario, password, rol, contiene, instancia_tipo, ip_priv, ip_pub, row_color FROM credenciales WHERE tab_id = ? ORDER BY display_order ASC, id ASC", (tab_id,))
+            cursor.execute(CREDENTIALS_BY_TAB_QUERY, (tab_id,))
             results = cursor.fetchall()
         
-        # Decrypt data if encryption manager is provided
-        if encryption_manager and results:
-            decrypted_results = []
-            for row in results:
-                decrypted_results.append(encryption_manager.decrypt_credential(row))
-            return decrypted_results
+        # Rows are decrypted lazily, field by field, when they are read
+        return self._decode_rows(results, encryption_manager, lazy=True)
+
+    def get_credential_tab(self, record_id):
+        """Tab id of a credential, or None if it does not exist."""
+        cursor = self.get_connection().cursor()
+        cursor.execute("SELECT tab_id FROM credenciales WHERE id = ?", (record_id,))
+        result = cursor.fetchone()
+        return result[0] if result else None
+
+    def _invalidate_cache(self, tab_id=None):
+        """Forget the decrypted rows of a tab, or of every tab if tab_id is None."""
+        if tab_id is None:
+            self._credential_cache.clear()
+        else:
+            self._credential_cache.pop(tab_id, None)
+
+    def _find_cached(self, record_id):
+        """Return the cache entry (encryption_manager, rows, by_id) holding a record, or None."""
+        try:
+            record_id = int(record_id)
+        except (TypeError, ValueError):
+            return None
+        for entry in self._credential_cache.values():
+            if record_id in entry[2]:
+                return entry
+        return None
+
+    def _patch_cached_record(self, record_id, make_row, encryption_manager=None):
+        """
+        Apply a single-row change to the cached tab holding a record.
+        
+        Args:
+            record_id: Record that changed
+            make_row: callable(old_row) -> new_row, or None if the record was deleted
+            encryption_manager: For changes built from plaintext data; the cache is
+                only patched if it was decrypted with this same manager
+        """
+        entry = self._find_cached(record_id)
+        if entry is None:
+            return
+        if make_row is not None and encryption_manager is not None and entry[0] is not encryption_manager:
+            self._credential_cache.clear()
+            return
         
-        return results
-    
+        _, rows, by_id = entry
+        old = by_id[int(record_id)]
+        index = rows.index(old)
+        if make_row is None:
+            del rows[index]
+            del by_id[old[0]]
+        else:
+            new = make_row(old)
+            rows[index] = new
+            by_id[old[0]] = new
+
+    def _swap_cached_records(self, tab_id, first_id, second_id):
+        """Swap the position of two records in a cached tab."""
+        first_id, second_id = int(first_id), int(second_id)
+        cached = self._credential_cache.get(tab_id)
+        if not cached or first_id not in cached[2] or second_id not in cached[2]:
+            self._invalidate_cache(tab_id)
+            return
+        _, rows, by_id = cached
+        i = rows.index(by_id[first_id])
+        j = rows.index(by_id[second_id])
+        rows[i], rows[j] = rows[j], rows[i]
+
+    def _move_cached_records(self, source_tabs, tab_id, ids, position):
+        """Move cached rows to index position of the cached target tab (see move_entries)."""
+        sources = [self._credential_cache.get(source) for source in source_tabs]
+        if len(sources) != 1 or not sources[0] or any(record_id not in sources[0][2] for record_id in ids):
+            for source in source_tabs:
+                self._invalidate_cache(source)
+            self._invalidate_cache(tab_id)
+            return
+        
+        (source,) = source_tabs
+        manager, rows, by_id = sources[0]
+        moved = [by_id[record_id] for record_id in ids]
+        moving = set(ids)
+        rows[:] = [row for row in rows if row[0] not in moving]
+        if source != tab_id:
+            for record_id in ids:
+                del by_id[record_id]
+            target = self._credential_cache.get(tab_id)
+            if not target or target[0] is not manager:
+                self._invalidate_cache(tab_id)
+                return
+            _, rows, by_id = target
+            by_id.update(zip(ids, moved))
+        rows[position:position] = moved
+
+    def _decode_rows(self, rows, encryption_manager, lazy=False):
+        """Decrypt raw rows (sealed or per-field), or drop the sealed column if no manager is given."""
+        if encryption_manager:
+            if lazy:
+                return encryption_manager.lazy_rows(rows)
+            return encryption_manager.decrypt_rows(rows) if rows else rows
+        return [row[:13] for row in rows]
+
+    def iter_credentials(self, tab_id, encryption_manager=None, chunk_size=500, lazy=False):
+        """
+        Stream the credentials of a tab in chunks instead of loading them all.
+        
+        Args:
+            tab_id (int): Tab to read
+            encryption_manager: Optional EncryptionManager used to decrypt each chunk
+            chunk_size (int): Rows fetched per fetchmany call
+            lazy (bool): Yield LazyRecords that decrypt fields on access
+            
+        Yields:
+            list: Chunk of rows, same layout as get_credentials
+        """
+        cursor = self.get_connection().cursor()
+        try:
+            cursor.execute(CREDENTIALS_BY_TAB_QUERY, (tab_id,))
+            while True:
+                chunk = cursor.fetchmany(chunk_size)
+                if not chunk:
+                    break
+                yield self._decode_rows(chunk, encryption_manager, lazy)
+        finally:
+            cursor.close()
+
+    def count_credentials(self, tab_id=None):
+        """Count credentials in a tab, or in the whole vault if tab_id is None."""
+        cursor = self.get_connection().cursor()
+        if tab_id is None:
+            cursor.execute("SELECT COUNT(*) FROM credenciales")
+        else:
+            cursor.execute(COUNT_BY_TAB_QUERY, (tab_id,))
+        return cursor.fetchone()[0]
+
     def is_data_encrypted(self):
         """Check if data in the database is already encrypted."""
         return self.get_setting("data_encrypted", "false") == "true"
@@ -225,106 +656,240 @@ class DatabaseManager:
         """Mark that data in the database is encrypted."""
         self.set_setting("data_encrypted", "true")
     
-    def migrate_to_encrypted(self, encryption_manager):
-        """Migrate all existing unencrypted data to encrypted format."""
+    def has_unsealed_records(self):
+        """Check if the sealed format is selected but some rows still use per-field tokens."""
+        if self.get_storage_format() != STORAGE_SEALED:
+            return False
+        cursor = self.get_connection().cursor()
+        cursor.execute("SELECT 1 FROM credenciales WHERE sealed IS NULL LIMIT 1")
+        return cursor.fetchone() is not None
+
+    def migrate_to_encrypted(self, encryption_manager, batch_size=MIGRATION_BATCH_SIZE, progress=None):
+        """
+        Migrate all existing unencrypted data to encrypted format, and convert
+        per-field rows to sealed records when the sealed storage format is selected.
+        
+        Rows are processed in id order, batch_size at a time. Each batch is
+        committed together with a checkpoint (last migrated id) in settings, so
+        an interrupted migration resumes where it stopped instead of encrypting
+        rows twice. Rows added after the migration started are already encrypted
+        and are left alone.
+        
+        Args:
+            encryption_manager: EncryptionManager used to encrypt the rows
+            batch_size (int): Rows read, encrypted and written per transaction
+            progress: Optional callable(done, total) invoked after each batch
+            
+        Returns:
+            tuple: (migrated_rows, rows_per_second)
+        """
         if self.is_data_encrypted():
-            return  # Already encrypted
+            return self.migrate_to_sealed(encryption_manager, batch_size, progress)
         
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
+        start = time.perf_counter()
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        # Resume from the checkpoint of an interrupted run
+        checkpoint = int(self.get_setting("migration_checkpoint", 0))
+        end_id = self.get_setting("migration_end_id")
+        if end_id is None:
+            cursor.execute("SELECT MAX(id) FROM credenciales")
+            end_id = cursor.fetchone()[0] or 0
+            self.set_setting("migration_end_id", str(end_id))
+        end_id = int(end_id)
+        
+        cursor.execute("SELECT COUNT(*) FROM credenciales WHERE id > ? AND id <= ?", (checkpoint, end_id))
+        total = cursor.fetchone()[0]
+        
+        # Encrypt every credential straight into the selected storage format
+        sealed = self.get_storage_format() == STORAGE_SEALED
+        done = 0
+        while True:
+            cursor.execute("SELECT id, detalle, tipo_acceso, acceso_host, puerto, usuario, password, rol, contiene, instancia_tipo, ip_priv, ip_pub FROM credenciales WHERE id > ? AND id <= ? ORDER BY id LIMIT ?", (checkpoint, end_id, batch_size))
+            batch = cursor.fetchall()
+            if not batch:
+                break
             
-            # Get all credentials
-            cursor.execute("SELECT id, detalle, tipo_acceso, acceso_host, puerto, usuario, password, rol, contiene, instancia_tipo, ip_priv, ip_pub, tab_id FROM credenciales")
-            all_credentials = cursor.fetchall()
+            # cred structure: (id, detalle, tipo_acceso, acceso_host, puerto, usuario, password, rol, contiene, instancia_tipo, ip_priv, ip_pub)
+            updates = [(*self._encrypt_fields(cred[1:12], encryption_manager, sealed), cred[0]) for cred in batch]
+            checkpoint = batch[-1][0]
+            with conn:
+                self._update_credentials(cursor, updates)
+                cursor.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", ("migration_checkpoint", str(checkpoint)))
             
-            # Encrypt and update each credential
-            for cred in all_credentials:
-                cred_id = cred[0]
-                # Extract data fields (skip id)
-                # cred structure: (id, detalle, tipo_acceso, acceso_host, puerto, usuario, password, rol, contiene, instancia_tipo, ip_priv, ip_pub, tab_id)
-                # Indices:         0    1        2            3             4       5         6         7     8         9               10        11        12
-                data = cred[1:12]  # detalle through ip_pub (indices 1-11)
-                tab_id = cred[12]  # tab_id is at index 12
-                
-                # Encrypt the data
-                data_with_tab = (*data, tab_id)
-                encrypted = encryption_manager.encrypt_credential(data_with_tab)
-                encrypted_data = encrypted[:-1]  # Remove tab_id from encrypted data
-                
-                # Update the record
-                cursor.execute('''
-                    UPDATE credenciales 
-                    SET detalle=?, tipo_acceso=?, acceso_host=?, puerto=?, usuario=?, password=?, rol=?, contiene=?, instancia_tipo=?, ip_priv=?, ip_pub=?
-                    WHERE id=?
-                ''', (*encrypted_data, cred_id))
+            done += len(batch)
+            if progress:
+                progress(done, total)
+        
+        # Mark as encrypted and drop the checkpoint in the same transaction
+        with conn:
+            cursor.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", ("data_encrypted", "true"))
+            cursor.execute("DELETE FROM settings WHERE key IN ('migration_checkpoint', 'migration_end_id')")
+        self._invalidate_cache()
+        
+        elapsed = time.perf_counter() - start
+        return done, (done / elapsed if elapsed > 0 else 0.0)
+
+    def migrate_to_sealed(self, encryption_manager, batch_size=MIGRATION_BATCH_SIZE, progress=None):
+        """
+        Convert encrypted per-field rows into sealed records (one token per row).
+        
+        Works in committed batches; converted rows have sealed set, so an
+        interrupted run simply continues with the remaining ones.
+        
+        Returns:
+            tuple: (converted_rows, rows_per_second)
+        """
+        if not self.has_unsealed_records():
+            return 0, 0.0
+        
+        start = time.perf_counter()
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM credenciales WHERE sealed IS NULL")
+        total = cursor.fetchone()[0]
+        
+        done = 0
+        while True:
+            cursor.execute("SELECT id, detalle, tipo_acceso, acceso_host, puerto, usuario, password, rol, contiene, instancia_tipo, ip_priv, ip_pub, row_color, sealed FROM credenciales WHERE sealed IS NULL ORDER BY id LIMIT ?", (batch_size,))
+            batch = cursor.fetchall()
+            if not batch:
+                break
+            rows = encryption_manager.decrypt_rows(batch)
+            updates = [(*self._encrypt_fields(row[1:12], encryption_manager, True), row[0]) for row in rows]
+            with conn:
+                self._update_credentials(cursor, updates)
             
-            conn.commit()
+            done += len(batch)
+            if progress:
+                progress(done, total)
+        self._invalidate_cache()
         
-        # Mark as encrypted
-        self.mark_data_encrypted()
+        elapsed = time.perf_counter() - start
+        return done, (done / elapsed if elapsed > 0 else 0.0)
     
     def move_entry_up(self, record_id, tab_id):
-        """Move an entry up in the display order."""
+        """Move an entry up in the display order. Returns the id of the swapped neighbour, or False."""
+        return self._swap_with_neighbour(record_id, tab_id, PREV_ENTRY_QUERY)
+    
+    def move_entry_down(self, record_id, tab_id):
+        """Move an entry down in the display order. Returns the id of the swapped neighbour, or False."""
+        return self._swap_with_neighbour(record_id, tab_id, NEXT_ENTRY_QUERY)
+
+    def _swap_with_neighbour(self, record_id, tab_id, neighbour_query):
         with self.get_connection() as conn:
             cursor = conn.cursor()
+            # Neighbour and current order in one lookup
+            cursor.execute(neighbour_query, (record_id,))
+            neighbour = cursor.fetchone()
+            if not neighbour:
+                return False  # Already at the top/bottom
             
-            # Get current order
-            cursor.execute("SELECT display_order FROM credenciales WHERE id = ?", (record_id,))
-            result = cursor.fetchone()
-            if not result:
-                return False
-            
-            current_order = result[0]
-            
-            # Find the entry above (with lower order in same tab)
-            cursor.execute("""
-                SELECT id, display_order FROM credenciales 
-                WHERE tab_id = ? AND display_order < ? 
-                ORDER BY display_order DESC LIMIT 1
-            """, (tab_id, current_order))
-            
-            above_entry = cursor.fetchone()
-            if not above_entry:
-                return False  # Already at top
-            
-            above_id, above_order = above_entry
+            neighbour_id, neighbour_order, current_order = neighbour
             
             # Swap orders
-            cursor.execute("UPDATE credenciales SET display_order = ? WHERE id = ?", (above_order, record_id))
-            cursor.execute("UPDATE credenciales SET display_order = ? WHERE id = ?", (current_order, above_id))
+            cursor.executemany("UPDATE credenciales SET display_order = ? WHERE id = ?",
+                               ((neighbour_order, record_id), (current_order, neighbour_id)))
+        
+        self._swap_cached_records(tab_id, record_id, neighbour_id)
+        return neighbour_id
+
+    def move_entries(self, record_ids, tab_id, position):
+        """
+        Move records to index `position` of a tab, keeping their relative order.
+        
+        Works within a tab (drag and drop, "move to position N") and across
+        tabs. Each moved row gets a new display_order between its new
+        neighbours, so the cost is one UPDATE per moved row whatever the
+        distance; the target tab is renumbered only when the gap between the
+        neighbours is used up.
+        
+        Args:
+            record_ids (list): Records to move
+            tab_id (int): Target tab
+            position (int): Index in the target tab, counted without the moved
+                rows; clamped to the start/end of the tab
             
-            conn.commit()
-            return True
-    
-    def move_entry_down(self, record_id, tab_id):
-        """Move an entry down in the display order."""
+        Returns:
+            list: Ids of the moved records in their new order
+        """
+        ids = list(dict.fromkeys(int(record_id) for record_id in record_ids))
+        if not ids:
+            return []
+        
         with self.get_connection() as conn:
             cursor = conn.cursor()
+            marks = ",".join("?" * len(ids))
+            cursor.execute(f"SELECT id, tab_id FROM credenciales WHERE id IN ({marks}) ORDER BY display_order ASC, id ASC", ids)
+            found = cursor.fetchall()
+            ids = [row[0] for row in found]
+            source_tabs = {row[1] for row in found}
+            if not ids:
+                return []
             
-            # Get current order
-            cursor.execute("SELECT display_order FROM credenciales WHERE id = ?", (record_id,))
-            result = cursor.fetchone()
-            if not result:
-                return False
-            
-            current_order = result[0]
-            
-            # Find the entry below (with higher order in same tab)
-            cursor.execute("""
-                SELECT id, display_order FROM credenciales 
-                WHERE tab_id = ? AND display_order > ? 
-                ORDER BY display_order ASC LIMIT 1
-            """, (tab_id, current_order))
-            
-            below_entry = cursor.fetchone()
-            if not below_entry:
-                return False  # Already at bottom
-            
-            below_id, below_order = below_entry
-            
-            # Swap orders
-            cursor.execute("UPDATE credenciales SET display_order = ? WHERE id = ?", (below_order, record_id))
-            cursor.execute("UPDATE credenciales SET display_order = ? WHERE id = ?", (current_order, below_id))
-            
-            conn.commit()
-            return True
+            position = max(0, position)
+            keys = self._order_keys_at(cursor, tab_id, ids, position)
+            if keys is None:
+                # No free keys between the neighbours: renumber, leaving room at position
+                self._rebalance_order(cursor, tab_id, skip_ids=ids, hole_at=position, hole=len(ids))
+                keys = self._order_keys_at(cursor, tab_id, ids, position)
+            cursor.executemany("UPDATE credenciales SET tab_id = ?, display_order = ? WHERE id = ?",
+                               [(tab_id, key, record_id) for key, record_id in zip(keys, ids)])
+        
+        self._move_cached_records(source_tabs, tab_id, ids, position)
+        return ids
+
+    def _order_keys_at(self, cursor, tab_id, skip_ids, position):
+        """Free display_order keys for len(skip_ids) rows at index position of a tab, or None."""
+        marks = ",".join("?" * len(skip_ids))
+        neighbours = f"SELECT display_order FROM credenciales WHERE tab_id = ? AND id NOT IN ({marks}) ORDER BY display_order ASC, id ASC LIMIT ? OFFSET ?"
+        if position == 0:
+            cursor.execute(neighbours, (tab_id, *skip_ids, 1, 0))
+            row = cursor.fetchone()
+            return self._keys_between(None, row[0] if row else None, len(skip_ids))
+        
+        cursor.execute(neighbours, (tab_id, *skip_ids, 2, position - 1))
+        keys = [row[0] for row in cursor.fetchall()]
+        if not keys:
+            # Past the end of the tab: append
+            cursor.execute(f"SELECT MAX(display_order) FROM credenciales WHERE tab_id = ? AND id NOT IN ({marks})", (tab_id, *skip_ids))
+            keys = [cursor.fetchone()[0]]
+        return self._keys_between(keys[0], keys[1] if len(keys) > 1 else None, len(skip_ids))
+
+    @staticmethod
+    def _keys_between(low, high, count):
+        """
+        count integer keys strictly between low and high, evenly spaced.
+        
+        None means no neighbour on that side. Returns None if there is no room.
+        """
+        if low is None and high is None:
+            low, high = 0, (count + 1) * ORDER_GAP
+        elif low is None:
+            low = high - (count + 1) * ORDER_GAP
+        elif high is None:
+            high = low + (count + 1) * ORDER_GAP
+        if high - low <= count:
+            return None
+        step = (high - low) / (count + 1)
+        return [low + int(step * (i + 1)) for i in range(count)]
+
+    @staticmethod
+    def _spread_keys(ids, hole_at=None, hole=0):
+        """(key, id) pairs ORDER_GAP apart, with room for `hole` more keys before index hole_at."""
+        pairs = []
+        key = 0
+        for index, record_id in enumerate(ids):
+            if index == hole_at:
+                key += hole * ORDER_GAP
+            key += ORDER_GAP
+            pairs.append((key, record_id))
+        return pairs
+
+    def _rebalance_order(self, cursor, tab_id, skip_ids=(), hole_at=None, hole=0):
+        """Renumber the display_order of a tab ORDER_GAP apart (leaving the skipped rows out)."""
+        skip = set(skip_ids)
+        cursor.execute("SELECT id FROM credenciales WHERE tab_id = ? ORDER BY display_order ASC, id ASC", (tab_id,))
+        ids = [row[0] for row in cursor.fetchall() if row[0] not in skip]
+        cursor.executemany("UPDATE credenciales SET display_order = ? WHERE id = ?", self._spread_keys(ids, hole_at, hole))
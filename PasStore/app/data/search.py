@@ -0,0 +1,129 @@
+from collections import defaultdict
+
+# Campos indexados (índices en la fila desencriptada); la contraseña (6) nunca se indexa
+INDEXED_FIELDS = (1, 2, 3, 4, 5, 7, 8, 9, 10, 11)
+# Campos que se guardan para mostrar los resultados (detalle, host, user)
+SUMMARY_FIELDS = (1, 3, 5)
+FIELD_SEPARATOR = "\x00"
+GRAM_SIZE = 3
+
+
+def _grams(text):
+    return {text[i:i + GRAM_SIZE] for i in range(len(text) - GRAM_SIZE + 1)}
+
+
+class SearchIndex:
+    """
+    In-memory trigram index over the decrypted credentials of every tab.
+    
+    Nothing is written to disk: the index is rebuilt from the encrypted vault
+    after unlock and kept up to date by the callers of the write methods.
+    It holds the lowercased text of every INDEXED_FIELDS field plus the
+    SUMMARY_FIELDS values shown in the results, but never the password.
+    Not thread-safe: build() runs on the worker, so the UI must not touch
+    the index until it returns.
+    """
+    
+    def __init__(self):
+        self.ready = False
+        self._records = {}                 # record_id -> (tab_id, text, summary)
+        self._postings = defaultdict(set)  # trigram -> {record_id}
+    
+    def build(self, db, encryption_manager):
+        """Index every credential of every tab, streaming one chunk at a time."""
+        self.clear()
+        for tab_id, _, _ in db.get_tabs():
+            for chunk in db.iter_credentials(tab_id, encryption_manager, lazy=True):
+                for row in chunk:
+                    self.add(tab_id, row)
+        self.ready = True
+    
+    def clear(self):
+        self.ready = False
+        self._records.clear()
+        self._postings.clear()
+    
+    def add(self, tab_id, row):
+        """
+        Index a decrypted row (id, detalle ... ip_pub[, row_color]).
+        
+        Adding an id that is already indexed replaces it.
+        """
+        record_id = row[0]
+        if record_id in self._records:
+            self.remove(record_id)
+        text = FIELD_SEPARATOR.join(str(row[i]).lower() for i in INDEXED_FIELDS if i < len(row) and row[i])
+        summary = (record_id, *(row[i] for i in SUMMARY_FIELDS))
+        self._records[record_id] = (tab_id, text, summary)
+        for gram in _grams(text):
+            self._postings[gram].add(record_id)
+    
+    def remove(self, record_id):
+        entry = self._records.pop(record_id, None)
+        if entry is None:
+            return
+        for gram in _grams(entry[1]):
+            ids = self._postings.get(gram)
+            if ids is not None:
+                ids.discard(record_id)
+                if not ids:
+                    del self._postings[gram]
+    
+    def move_to_tab(self, record_ids, tab_id):
+        """Record that credentials moved to another tab (their text is unchanged)."""
+        for record_id in record_ids:
+            entry = self._records.get(record_id)
+            if entry is not None:
+                self._records[record_id] = (tab_id, *entry[1:])
+    
+    def remove_tab(self, tab_id):
+        for record_id in [rid for rid, entry in self._records.items() if entry[0] == tab_id]:
+            self.remove(record_id)
+    
+    def search(self, query, limit=100):
+        """
+        Find credentials whose indexed fields contain the query (case-insensitive).
+        
+        Substring matches come first; if there are none, records sharing most
+        of the query's trigrams are returned as fuzzy matches.
+        
+        Returns:
+            list: (tab_id, (record_id, detalle, host, user)) tuples ordered by record id
+        """
+        query = query.strip().lower()
+        if not query:
+            return []
+        
+        if len(query) < GRAM_SIZE:
+            # Too short for trigrams: plain scan
+            ids = [rid for rid, (_, text, _) in self._records.items() if query in text]
+            return self._results(ids, limit)
+        
+        grams = sorted(_grams(query), key=lambda g: len(self._postings.get(g, ())))
+        candidates = set(self._postings.get(grams[0], ()))
+        for gram in grams[1:]:
+            if not candidates:
+                break
+            candidates &= self._postings.get(gram, set())
+        ids = [rid for rid in candidates if query in self._records[rid][1]]
+        if ids:
+            return self._results(ids, limit)
+        return self._fuzzy(grams, limit)
+    
+    def _fuzzy(self, grams, limit):
+        scores = defaultdict(int)
+        for gram in grams:
+            for rid in self._postings.get(gram, ()):
+                scores[rid] += 1
+        # At least half of the trigrams must match
+        threshold = max(1, len(grams) // 2)
+        ranked = sorted((rid for rid, score in scores.items() if score >= threshold),
+                        key=lambda rid: (-scores[rid], rid))
+        return [self._hit(rid) for rid in ranked[:limit]]
+    
+    def _results(self, ids, limit):
+        return [self._hit(rid) for rid in sorted(ids)[:limit]]
+    
+    def _hit(self, record_id):
+        tab_id, _, summary = self._records[record_id]
+        return tab_id, summary
@@ -1,2 +1,9 @@
-from .login import LoginWindow
-from .main_window import MainApp
+# Lazy re-exports: the login window must not wait for the main window's imports
+def __getattr__(name):
+    if name == "LoginWindow":
+        from .login import LoginWindow
+        return LoginWindow
+    if name == "MainApp":
+        from .main_window import MainApp
+        return MainApp
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
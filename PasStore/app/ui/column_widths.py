@@ -0,0 +1,75 @@
+from collections import Counter, OrderedDict
+import tkinter.font as tkfont
+
+# Padding añadido a cada texto medido
+CELL_PADDING = 20
+# Textos medidos que se recuerdan (LRU), para no crecer sin límite
+MEASURE_CACHE_SIZE = 4096
+# Columnas cuyos valores se miden pero nunca se recuerdan (contraseñas)
+UNMEMOIZED_COLUMNS = ("Pass",)
+
+
+class ColumnWidthCache:
+    """
+    Tracks the widest measured cell per Treeview column.
+    
+    Widths are kept as a multiset per column, so rows can be added and removed
+    incrementally without rescanning the table. Measured strings are memoized
+    in a bounded LRU, so repeated values cost a single font.measure call;
+    values of the UNMEMOIZED_COLUMNS are measured every time instead, so no
+    password outlives the rows shown in the table.
+    """
+    
+    def __init__(self, columns, unmemoized_columns=UNMEMOIZED_COLUMNS):
+        self.columns = tuple(columns)
+        self._memoize = tuple(col not in unmemoized_columns for col in self.columns)
+        self._font = None
+        self._measured = OrderedDict()
+        self._widths = {col: Counter() for col in self.columns}
+    
+    def measure(self, text, memoize=True):
+        """Return the padded pixel width of a text with the default font."""
+        text = str(text)
+        width = self._measured.get(text)
+        if width is not None:
+            self._measured.move_to_end(text)
+            return width
+        if self._font is None:
+            self._font = tkfont.Font()
+        width = self._font.measure(text) + CELL_PADDING
+        if memoize:
+            self._measured[text] = width
+            if len(self._measured) > MEASURE_CACHE_SIZE:
+                self._measured.popitem(last=False)
+        return width
+    
+    def add(self, values):
+        """Account for a row inserted in the Treeview."""
+        for col, value, memoize in zip(self.columns, values, self._memoize):
+            self._widths[col][self.measure(value, memoize)] += 1
+    
+    def remove(self, values):
+        """Forget a row removed from (or replaced in) the Treeview."""
+        for col, value, memoize in zip(self.columns, values, self._memoize):
+            counts = self._widths[col]
+            width = self.measure(value, memoize)
+            counts[width] -= 1
+            if counts[width] <= 0:
+                del counts[width]
+    
+    def clear(self):
+        """Drop the rows and the measured texts (new data, same font)."""
+        self._measured.clear()
+        for counts in self._widths.values():
+            counts.clear()
+    
+    def invalidate(self):
+        """Drop everything and the font too (font or theme changed)."""
+        self._font = None
+        self.clear()
+    
+    def content_width(self, col, header_text):
+        """Widest of the header and the tracked cells of a column."""
+        counts = self._widths[col]
+        cells = max(counts) if counts else 0
+        return max(self.measure(header_text), cells)
@@ -1,22 +1,41 @@
+import importlib
 import tkinter as tk
-from tkinter import messagebox
-from app.utils.security import SecurityManager
-from app.config import THEMES
+from tkinter import ttk, messagebox
+from app.config import MASTER_PASSWORD_SETTINGS, THEMES
 from app.data.database import DatabaseManager
-from app.ui.main_window import MainApp
+
+# Módulos pesados (cryptography, ventana principal) que se cargan en segundo
+# plano mientras el usuario escribe la contraseña; el login pinta sin ellos
+PRELOAD_MODULES = ("app.utils.security", "app.ui.main_window")
+
+
+def preload_modules():
+    for name in PRELOAD_MODULES:
+        importlib.import_module(name)
+
+
+def _security():
+    """SecurityManager, imported on first use (normally already preloaded)."""
+    from app.utils.security import SecurityManager
+    return SecurityManager
+
 
 class LoginWindow:
-    def __init__(self, root, app_version=None):
+    def __init__(self, root, app_version=None, db=None):
         self.root = root
         self.app_version = app_version
         
-        # Load theme
-        self.db = DatabaseManager()
+        # Load theme (reuse the caller's connection if given)
+        self.db = db if db is not None else DatabaseManager()
+        # Key derivation is slow on purpose; it runs on self.tasks so the window
+        # keeps painting. The worker is started after the first paint
+        self.tasks = None
+        self.busy = False
         saved_theme = self.db.get_setting("theme", "Light")
         self.theme = THEMES[saved_theme]
         
-        # Check if master password exists
-        self.is_setup_mode = not SecurityManager.has_master_password(self.db)
+        # Check if master password exists (same check as SecurityManager.has_master_password)
+        self.is_setup_mode = not any(self.db.get_setting(key) is not None for key in MASTER_PASSWORD_SETTINGS)
         
         title = "Configurar Contraseña Maestra" if self.is_setup_mode else "Login Seguro"
         if self.app_version:
@@ -26,7 +45,7 @@ class LoginWindow:
         # Center and configure
         screen_width = self.root.winfo_screenwidth()
         screen_height = self.root.winfo_screenheight()
-        width, height = 300, 250 if self.is_setup_mode else 160
+        width, height = 300, 270 if self.is_setup_mode else 180
         x = (screen_width // 2) - (width // 2)
         y = (screen_height // 2) - (height // 2)
         self.root.geometry(f'{width}x{height}+{x}+{y}')
@@ -48,10 +67,25 @@ class LoginWindow:
              self.confirm_entry.bind('<Return>', self.handle_action)
 
         btn_text = "Guardar e Ingresar" if self.is_setup_mode else "Ingresar"
-        btn = tk.Button(root, text=btn_text, command=self.handle_action, bg=self.theme["btn_bg"], fg=self.theme["btn_fg"], width=20)
-        btn.pack(pady=15)
+        self.btn = tk.Button(root, text=btn_text, command=self.handle_action, bg=self.theme["btn_bg"], fg=self.theme["btn_fg"], width=20)
+        self.btn.pack(pady=15)
+        
+        # Spinner while the password is checked
+        self.spinner = ttk.Progressbar(root, length=150, mode="indeterminate")
+        
+        self.root.after_idle(self.start_tasks)
+
+    def start_tasks(self):
+        """Start the background worker and preload the heavy modules on it."""
+        if self.tasks is None:
+            from app.utils.tasks import TaskRunner
+            self.tasks = TaskRunner(self.root)
+            self.tasks.submit(preload_modules)
+        return self.tasks
 
     def handle_action(self, event=None):
+        if self.busy:
+            return
         password = self.pass_entry.get()
         
         if not password:
@@ -64,27 +98,52 @@ class LoginWindow:
                 messagebox.showwarning("Error", "Las contraseñas no coinciden")
                 return
 
-            # Set new password
-            SecurityManager.set_master_password(self.db, password)
-            messagebox.showinfo("Éxito", "Contraseña maestra configurada correctamente.")
-            self.launch_app()
+            # Set new password (creates the vault key)
+            self.set_busy(True)
+            self.start_tasks().submit(lambda: _security().set_master_password(self.db, password),
+                                      on_done=self.on_password_set, on_error=self.on_unlock_error)
         else:
-            # Check existing password
-            master_hash = SecurityManager.get_master_hash(self.db)
-            if SecurityManager.verify_password(password, master_hash):
-                self.launch_app()
-            else:
-                messagebox.showerror("Error", "Contraseña incorrecta")
-                self.pass_entry.delete(0, tk.END)
-
-    def launch_app(self):
-        # Get the password that was just verified
-        password = self.pass_entry.get()
-        
-        # Create encryption manager
-        encryption_manager = SecurityManager.create_encryption_manager(password, self.db)
-        
+            # One key derivation both checks the password and unlocks the vault
+            self.set_busy(True)
+            self.start_tasks().submit(lambda: _security().unlock(password, self.db),
+                                      on_done=self.on_unlocked, on_error=self.on_unlock_error)
+
+    def set_busy(self, busy):
+        self.busy = busy
+        state = tk.DISABLED if busy else tk.NORMAL
+        self.btn.config(state=state)
+        self.pass_entry.config(state=state)
+        if self.is_setup_mode:
+            self.confirm_entry.config(state=state)
+        if busy:
+            self.spinner.pack(pady=2)
+            self.spinner.start(15)
+        else:
+            self.spinner.stop()
+            self.spinner.pack_forget()
+
+    def on_password_set(self, encryption_manager):
+        self.set_busy(False)
+        messagebox.showinfo("Éxito", "Contraseña maestra configurada correctamente.")
+        self.launch_app(encryption_manager)
+
+    def on_unlocked(self, encryption_manager):
+        self.set_busy(False)
+        if encryption_manager is None:
+            messagebox.showerror("Error", "Contraseña incorrecta")
+            self.pass_entry.delete(0, tk.END)
+            self.pass_entry.focus()
+            return
+        self.launch_app(encryption_manager)
+
+    def on_unlock_error(self, error):
+        self.set_busy(False)
+        messagebox.showerror("Error", f"No se pudo abrir la bóveda: {error}")
+
+    def launch_app(self, encryption_manager):
+        from app.ui.main_window import MainApp
+        self.tasks.shutdown()
         self.root.destroy()
         app = tk.Tk()
-        MainApp(app, encryption_manager)
+        MainApp(app, encryption_manager, db=self.db)
         app.mainloop()
@@ -1,24 +1,42 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-import csv
 from app.config import THEMES
 from app.data.database import DatabaseManager
+from app.data.csv_io import export_csv, import_csv
+from app.data.search import SearchIndex
+from app.ui.column_widths import ColumnWidthCache
+from app.utils import diagnostics
+from app.utils.encryption import LazyRecord
 from app.utils.security import SecurityManager
+from app.utils.tasks import TaskRunner
+
+# Tabla por ventanas: filas insertadas de una vez y margen para cargar más al hacer scroll
+TREE_PAGE_SIZE = 300
+TREE_PREFETCH_FRACTION = 0.9
+
+# Definición de columnas (mismo orden que las filas de la DB)
+COLUMNS = ("ID", "Detalle / SID", "Tipo acceso", "HOST / IP / DNS", "Puerto", "User", "Pass", "Rol", "Contiene", "Instancia / Tipo", "IP Priv", "IP Pub")
+
+
+def _is_blank(row, idx):
+    """Empty field check that does not decrypt lazy rows when it can avoid it."""
+    if isinstance(row, LazyRecord):
+        return row.is_blank(idx)
+    return row[idx] is None or row[idx] == ""
 
 class MainApp:
-    def __init__(self, root, encryption_manager):
+    def __init__(self, root, encryption_manager, db=None):
         self.root = root
         self.root.title("Gestor de Contraseñas - Tabla Maestra")
         self.root.geometry("1300x700")
         
-        self.db = DatabaseManager()
+        self.db = db if db is not None else DatabaseManager()
         self.encryption_manager = encryption_manager
-        
-        # Migrate existing data to encrypted format if needed
-        if not self.db.is_data_encrypted():
-            messagebox.showinfo("Migración de Datos", "Se detectaron datos sin encriptar. Se procederá a encriptarlos por seguridad.")
-            self.db.migrate_to_encrypted(self.encryption_manager)
-            messagebox.showinfo("Éxito", "Todos los datos han sido encriptados correctamente.")
+        # Métricas opcionales (Ctrl+Shift+D abre el diálogo de diagnóstico)
+        diagnostics.configure(self.db)
+        # DB y cripto se ejecutan en segundo plano; los resultados vuelven al loop de Tk
+        self.tasks = TaskRunner(self.root)
+        self._load_generation = 0
         
         self.current_tab_id = 1 # ID por defecto (Principal)
         self.current_tab_color = "#f0f0f0" # Default color
@@ -32,6 +50,13 @@ class MainApp:
         
         self.theme_cycle = ["Light", "Semi-Dark", "Dark"]
         
+        # Índice de búsqueda en memoria (se construye al usar el buscador por primera vez)
+        self.search_index = SearchIndex()
+        self.search_hits = []
+        self._search_timer = None
+        self._indexing = False
+        self._index_backlog = []  # cambios recibidos mientras se construye el índice
+        
         # Estructura principal
         self.create_widgets()
         
@@ -40,18 +65,70 @@ class MainApp:
         self.tab_frame.pack(side=tk.BOTTOM, fill=tk.X, padx=10, pady=10)
         
         self.load_tabs()
+        
+        # Migrate existing data to encrypted format if needed (runs before the first load)
+        if not self.db.is_data_encrypted():
+            messagebox.showinfo("Migración de Datos", "Se detectaron datos sin encriptar. Se procederá a encriptarlos por seguridad.")
+            self.show_progress(0, None, "Encriptando")
+            self.tasks.submit(self.db.migrate_to_encrypted, self.encryption_manager,
+                              on_progress=lambda done, total: self.show_progress(done, total, "Encriptando"),
+                              on_done=lambda result: self.finish_task("Éxito", f"Todos los datos han sido encriptados correctamente ({result[1]:,.0f} filas/s)."),
+                              on_error=lambda e: self.fail_task("Error al encriptar", e))
+        elif self.db.has_unsealed_records():
+            # Formato compacto seleccionado: convertir filas con un token por campo
+            self.show_progress(0, None, "Compactando")
+            self.tasks.submit(self.db.migrate_to_sealed, self.encryption_manager,
+                              on_progress=lambda done, total: self.show_progress(done, total, "Compactando"),
+                              on_done=lambda _: self.hide_progress(),
+                              on_error=lambda e: self.fail_task("Error al compactar", e))
+        
         self.load_data()
         
         # Bind window resize event for responsive columns
         self.root.bind('<Configure>', self.on_window_resize)
+        self.root.bind('<Control-D>', lambda e: self.show_diagnostics())
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
+    def on_close(self):
+        """Close the DB connections cleanly (flushes the WAL) before destroying the window."""
+        self.tasks.shutdown()
+        self.db.close()
+        self.root.destroy()
+
+    def finish_task(self, title, message):
+        """Completion callback for long background tasks."""
+        self.hide_progress()
+        messagebox.showinfo(title, message)
+
+    def fail_task(self, title, error):
+        """Error callback for background tasks."""
+        self.hide_progress()
+        messagebox.showerror("Error", f"{title}: {error}")
 
     def create_widgets(self):
+        # Barra de búsqueda (todas las pestañas)
+        self.search_frame = tk.Frame(self.root)
+        self.search_frame.pack(fill=tk.X, padx=10, pady=(10, 0))
+        tk.Label(self.search_frame, text="Buscar:", font=("Arial", 9)).pack(side=tk.LEFT)
+        self.search_entry = tk.Entry(self.search_frame, font=("Arial", 9), width=40)
+        self.search_entry.pack(side=tk.LEFT, padx=5)
+        self.search_entry.bind("<FocusIn>", self.ensure_search_index)
+        self.search_entry.bind("<KeyRelease>", self.on_search_changed)
+        self.search_entry.bind("<Escape>", lambda e: self.clear_search())
+        self.search_status = tk.Label(self.search_frame, text="", font=("Arial", 8))
+        self.search_status.pack(side=tk.LEFT, padx=5)
+        
+        # Resultados (solo visibles mientras hay una búsqueda activa)
+        self.search_results = tk.Listbox(self.root, height=6, font=("Arial", 9))
+        self.search_results.bind("<Double-1>", self.open_search_result)
+        self.search_results.bind("<Return>", self.open_search_result)
+        
         # Frame para la Tabla (Treeview)
         tree_frame = tk.Frame(self.root)
         tree_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
 
         # Definición de columnas (NUEVA ESTRUCTURA)
-        columns = ("ID", "Detalle / SID", "Tipo acceso", "HOST / IP / DNS", "Puerto", "User", "Pass", "Rol", "Contiene", "Instancia / Tipo", "IP Priv", "IP Pub")
+        columns = COLUMNS
         self.tree = ttk.Treeview(tree_frame, columns=columns, show="headings")
 
         # Initialize visibility state (all visible by default)
@@ -71,9 +148,9 @@ class MainApp:
             self.tree.column(col, width=100, anchor=tk.CENTER, minwidth=50, stretch=True)
 
         # Vertical Scrollbar
-        v_scrollbar = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self.tree.yview)
-        self.tree.configure(yscroll=v_scrollbar.set)
-        v_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.v_scrollbar = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscroll=self.on_tree_yscroll)
+        self.v_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         
         # Horizontal Scrollbar
         h_scrollbar = ttk.Scrollbar(tree_frame, orient=tk.HORIZONTAL, command=self.tree.xview)
@@ -85,12 +162,26 @@ class MainApp:
         # Configurar tag para filas alternas
         self.tree.tag_configure('oddrow', background='#f2f2f2')
         
+        # Filas del tab actual; solo las primeras tree_loaded_count están en el Treeview
+        self.tab_rows = []
+        self.tree_loaded_count = 0
+        self._page_job = None
+        self._select_job = None
+        # Ancho máximo medido por columna (se actualiza al insertar/borrar filas)
+        self.width_cache = ColumnWidthCache(columns)
+
         # Evento doble click para copiar password
         self.tree.bind("<Double-1>", self.on_double_click)
         # Evento selección para editar
         self.tree.bind("<<TreeviewSelect>>", self.on_tree_select)
         # Evento botón derecho para menú de colores
         self.tree.bind("<Button-3>", self.show_row_color_menu)
+        # Arrastrar y soltar filas para reordenarlas
+        self._drag_item = None
+        self._dragging = False
+        self.tree.bind("<ButtonPress-1>", self.on_drag_start, add="+")
+        self.tree.bind("<B1-Motion>", self.on_drag_motion, add="+")
+        self.tree.bind("<ButtonRelease-1>", self.on_drag_drop, add="+")
 
         # Frame para Entradas de datos (Formulario abajo)
         input_frame = tk.LabelFrame(self.root, text="Agregar Nueva Entrada / Actualizar")
@@ -161,6 +252,13 @@ class MainApp:
         self.copy_indicator.pack(side=tk.LEFT, padx=2)
         self.copy_timer = None  # Timer for LED reset
         
+        # Barra de progreso (solo visible durante operaciones largas)
+        self.progress_frame = tk.Frame(btn_frame)
+        self.progress_label = tk.Label(self.progress_frame, text="", font=("Arial", 8))
+        self.progress_label.pack(side=tk.LEFT, padx=2)
+        self.progress_bar = ttk.Progressbar(self.progress_frame, length=150, mode="determinate")
+        self.progress_bar.pack(side=tk.LEFT, padx=2)
+        
         # Apply initial theme
         self.root.after(100, self.apply_theme)
         
@@ -178,13 +276,8 @@ class MainApp:
         # current_data: (id, detalle, tipo_acceso, acceso_host, puerto, usuario, password, rol, contiene, instancia_tipo, ip_priv, ip_pub)
         # Indices:        0     1          2             3            4        5         6         7       8         9              10        11
         
-        # Get unencrypted data from database
-        all_creds = self.db.get_credentials(self.current_tab_id, self.encryption_manager)
-        current_data = None
-        for row in all_creds:
-            if str(row[0]) == str(self.selected_record_id): # row[0] is ID
-                current_data = row
-                break
+        # Get unencrypted data from the rows shown in the table
+        current_data = self.loaded_row(self.selected_record_id)
         
         if not current_data:
              return
@@ -213,6 +306,98 @@ class MainApp:
             if val is not None:
                 entry.insert(0, val)
 
+    # --- BÚSQUEDA ---
+    def ensure_search_index(self, event=None):
+        """Build the search index in the background on first use."""
+        if self.search_index.ready or self._indexing:
+            return
+        self._indexing = True
+        self.search_status.config(text="Indexando...")
+        
+        def done(_):
+            self._indexing = False
+            self.search_status.config(text="")
+            self.replay_index_backlog()
+            if self.search_entry.get().strip():
+                self.run_search()
+        
+        def failed(error):
+            self._indexing = False
+            self.search_status.config(text="")
+            self.replay_index_backlog()
+            messagebox.showerror("Error", f"Error al indexar: {error}")
+        
+        self.tasks.submit(self.search_index.build, self.db, self.encryption_manager, on_done=done, on_error=failed)
+
+    def update_search_index(self, change, *args):
+        """
+        Apply change(*args) to the search index once its write has committed.
+        
+        While build() runs on the worker the index is not touched from the Tk
+        thread: the change is queued and replayed when the build finishes
+        (the build may have read the vault before the write).
+        """
+        if self._indexing:
+            self._index_backlog.append((change, args))
+        else:
+            change(*args)
+
+    def replay_index_backlog(self):
+        backlog, self._index_backlog = self._index_backlog, []
+        for change, args in backlog:
+            change(*args)
+
+    def on_search_changed(self, event=None):
+        # Debounce keystrokes
+        if self._search_timer:
+            self.root.after_cancel(self._search_timer)
+        self._search_timer = self.root.after(150, self.run_search)
+
+    def run_search(self):
+        self._search_timer = None
+        query = self.search_entry.get()
+        if not query.strip():
+            self.hide_search_results()
+            return
+        
+        if not self.search_index.ready:
+            # The search runs again once the index is built
+            self.ensure_search_index()
+            return
+        self.search_hits = self.search_index.search(query)
+        tab_names = {t_id: t_name for t_id, t_name, _ in self.db.get_tabs()}
+        
+        self.search_results.delete(0, tk.END)
+        for tab_id, summary in self.search_hits:
+            # Pestaña | Detalle | Host | User
+            parts = [tab_names.get(tab_id, "?")] + [str(value) for value in summary[1:] if value]
+            self.search_results.insert(tk.END, "  |  ".join(parts))
+        
+        self.search_status.config(text=f"{len(self.search_hits)} resultados")
+        if not self.search_results.winfo_ismapped():
+            self.search_results.pack(fill=tk.X, padx=10, pady=(5, 0), after=self.search_frame)
+
+    def open_search_result(self, event=None):
+        """Jump to the tab of the selected result and select its row."""
+        selection = self.search_results.curselection()
+        if not selection:
+            return
+        tab_id, (record_id, *_) = self.search_hits[selection[0]]
+        if tab_id != self.current_tab_id:
+            self.switch_tab(tab_id, on_loaded=lambda: self.select_record(record_id))
+        else:
+            self.select_record(record_id)
+
+    def hide_search_results(self):
+        self.search_hits = []
+        self.search_results.delete(0, tk.END)
+        self.search_results.pack_forget()
+        self.search_status.config(text="")
+
+    def clear_search(self):
+        self.search_entry.delete(0, tk.END)
+        self.hide_search_results()
+
     def update_entry(self):
         if not self.selected_record_id:
              messagebox.showwarning("Error", "No hay ningún registro seleccionado para actualizar")
@@ -237,10 +422,13 @@ class MainApp:
             self.entries["IP Pub"].get()
         )
         
-        self.db.update_credential(self.selected_record_id, data, self.encryption_manager)
+        record_id = int(self.selected_record_id)
+        tab_id = self.current_tab_id
         self.clear_inputs()
         self.selected_record_id = None
-        self.load_data()
+        self.submit_row_change(self.db.update_credential, record_id, data, self.encryption_manager,
+                               on_done=lambda _, rows: self.apply_row_updated(record_id, rows),
+                               on_written=lambda _: self.update_search_index(self.search_index.add, tab_id, (record_id, *data)))
 
     def update_header(self, col):
         if col == "ID":
@@ -280,10 +468,19 @@ class MainApp:
         next_idx = (idx + 1) % len(self.theme_cycle)
         self.current_theme = self.theme_cycle[next_idx]
         
-        # Save new theme
-        self.db.set_setting("theme", self.current_theme)
+        # Save new theme (on the worker, like every other write)
+        self.tasks.submit(self.db.set_setting, "theme", self.current_theme)
         
         self.apply_theme()
+        self.rebuild_width_cache()
+
+    def rebuild_width_cache(self):
+        """Re-measure the loaded rows (only needed when the font/theme changes)."""
+        self.width_cache.invalidate()
+        for i in range(self.tree_loaded_count):
+            values, _ = self.format_row(i, self.tab_rows[i])
+            self.width_cache.add(values)
+        self.auto_resize_columns()
 
     def apply_theme(self):
         theme = self.themes[self.current_theme]
@@ -404,58 +601,38 @@ class MainApp:
 
         confirm = messagebox.askyesno("Confirmar Eliminación", f"¿Quiere borrar la pestaña '{current_name}'?\nSe perderán todas las credenciales de esta pestaña.")
         if confirm:
-            self.db.delete_tab(self.current_tab_id)
-            # Switch to the first available tab
-            remaining_tabs = self.db.get_tabs()
-            if remaining_tabs:
-                self.current_tab_id = remaining_tabs[0][0]
-            else:
-                # Should not happen due to len check, but safe fallback
-                self.current_tab_id = None 
-            
-            self.load_tabs()
-            self.load_data()
-
-    def move_tab_left(self):
-        tabs = self.db.get_tabs()
-        # tabs is list of (id, name, color) tuples
-        
-        # Find current index
-        current_idx = -1
-        for i, (t_id, _, _) in enumerate(tabs):
-            if t_id == self.current_tab_id:
-                current_idx = i
-                break
-        
-        if current_idx <= 0:
-            return # Can't move left
-            
-        # Swap in the list (we need to convert tuple to list to modify or just swap elements in list)
-        tabs[current_idx], tabs[current_idx-1] = tabs[current_idx-1], tabs[current_idx]
+            tab_id = self.current_tab_id
+            self.tasks.submit(self.db.delete_tab, tab_id, on_done=lambda _: self.on_tab_deleted(tab_id))
+
+    def on_tab_deleted(self, tab_id):
+        self.update_search_index(self.search_index.remove_tab, tab_id)
+        # Switch to the first available tab
+        remaining_tabs = self.db.get_tabs()
+        if remaining_tabs:
+            self.current_tab_id = remaining_tabs[0][0]
+        else:
+            # Should not happen due to len check, but safe fallback
+            self.current_tab_id = None 
         
-        # Update order in DB
-        new_order_ids = [t[0] for t in tabs]
-        self.db.update_tab_order(new_order_ids)
         self.load_tabs()
+        self.load_data()
+
+    def move_tab_left(self):
+        self.move_current_tab(-1)
 
     def move_tab_right(self):
-        tabs = self.db.get_tabs()
-        
-        current_idx = -1
-        for i, (t_id, _, _) in enumerate(tabs):
-            if t_id == self.current_tab_id:
-                current_idx = i
-                break
-        
-        if current_idx == -1 or current_idx >= len(tabs) - 1:
-            return # Can't move right
-            
-        # Swap
-        tabs[current_idx], tabs[current_idx+1] = tabs[current_idx+1], tabs[current_idx]
+        self.move_current_tab(1)
+
+    def move_current_tab(self, offset):
+        """Move the current tab one place left (-1) or right (+1)."""
+        tab_ids = [t[0] for t in self.db.get_tabs()]
+        if self.current_tab_id not in tab_ids:
+            return
+        new_index = tab_ids.index(self.current_tab_id) + offset
+        if not 0 <= new_index < len(tab_ids):
+            return # Already at the edge
         
-        new_order_ids = [t[0] for t in tabs]
-        self.db.update_tab_order(new_order_ids)
-        self.load_tabs()
+        self.tasks.submit(self.db.move_tab, self.current_tab_id, new_index, on_done=lambda _: self.load_tabs())
 
     def show_context_menu(self, event, tab_id, current_name):
         menu = tk.Menu(self.root, tearoff=0)
@@ -497,9 +674,8 @@ class MainApp:
         def save():
             new_name = entry.get()
             if new_name:
-                self.db.rename_tab(tab_id, new_name)
                 dialog.destroy()
-                self.load_tabs()
+                self.tasks.submit(self.db.rename_tab, tab_id, new_name, on_done=lambda _: self.load_tabs())
 
         tk.Button(dialog, text="Guardar", bg="#4CAF50", fg="white", command=save).pack(pady=10)
         dialog.bind('<Return>', lambda e: save())
@@ -521,9 +697,8 @@ class MainApp:
         
         # Helper to set the color to DB
         def set_color(c):
-            self.db.update_tab_color(tab_id, c)
             dialog.destroy()
-            self.load_tabs() # Refresh UI
+            self.tasks.submit(self.db.update_tab_color, tab_id, c, on_done=lambda _: self.load_tabs()) # Refresh UI
         
         for i, color in enumerate(colors):
             row = i // 5
@@ -531,10 +706,10 @@ class MainApp:
             btn = tk.Button(color_frame, bg=color, width=4, command=lambda c=color: set_color(c))
             btn.grid(row=row, column=col, padx=2, pady=2)
 
-    def switch_tab(self, tab_id):
+    def switch_tab(self, tab_id, on_loaded=None):
         self.current_tab_id = tab_id
         self.load_tabs() 
-        self.load_data() 
+        self.load_data(on_loaded) 
 
     def open_new_tab_dialog(self):
         dialog, theme = self.create_styled_toplevel("Nueva Pestaña", 400, 300)
@@ -567,9 +742,8 @@ class MainApp:
             name = name_entry.get()
             color = selected_color.get()
             if name:
-                self.db.add_tab(name, color)
                 dialog.destroy()
-                self.load_tabs()
+                self.tasks.submit(self.db.add_tab, name, color, on_done=lambda _: self.load_tabs())
         
         tk.Button(dialog, text="Crear", bg="#4CAF50", fg="white", command=create).pack(pady=10)
 
@@ -597,9 +771,13 @@ class MainApp:
             self.current_tab_id
         )
         
-        self.db.add_credential(data, self.encryption_manager)
         self.clear_inputs()
-        self.load_data()
+        
+        def added(record_id):
+            self.update_search_index(self.search_index.add, data[-1], (record_id, *data[:-1]))
+        
+        self.submit_row_change(self.db.add_credential, data, self.encryption_manager,
+                               on_done=self.apply_row_added, on_written=added)
 
     def insert_separator(self):
         """Insert a separator row (all empty fields) with the current tab color"""
@@ -619,8 +797,7 @@ class MainApp:
             self.current_tab_id
         )
         
-        self.db.add_credential(data, self.encryption_manager)
-        self.load_data()
+        self.submit_row_change(self.db.add_credential, data, self.encryption_manager, on_done=self.apply_row_added)
 
     def delete_entry(self):
         selected = self.tree.selection()
@@ -633,91 +810,244 @@ class MainApp:
 
         confirm = messagebox.askyesno("Confirmar", "¿Seguro que deseas eliminar este registro?")
         if confirm:
-            self.db.delete_credential(record_id)
-            self.load_data()
-
-    def load_data(self):
-        for row in self.tree.get_children():
-            self.tree.delete(row)
+            self.submit_row_change(self.db.delete_credential, record_id,
+                                   on_done=lambda _, rows: self.apply_row_deleted(record_id, rows),
+                                   on_written=lambda _: self.update_search_index(self.search_index.remove, int(record_id)))
+
+    def load_data(self, on_loaded=None):
+        """Read and decrypt the current tab in the background, then show it."""
+        self._load_generation += 1
+        generation = self._load_generation
+        self.tasks.submit(self.db.get_credentials, self.current_tab_id, self.encryption_manager,
+                          on_done=lambda rows: self.show_rows(generation, rows, on_loaded))
+
+    def show_rows(self, generation, rows, on_loaded=None):
+        # A newer load was requested meanwhile (e.g. quick tab switches)
+        if generation != self._load_generation:
+            return
+        
+        self.tree.delete(*self.tree.get_children())
             
-        rows = self.db.get_credentials(self.current_tab_id, self.encryption_manager)
+        self.tab_rows = rows
+        self.tree_loaded_count = 0
+        self.width_cache.clear()
         
+        # Only the first page is inserted; the rest is paged in on scroll
+        self.insert_next_page()
+        
+        # Auto-resize columns after loading data
+        self.auto_resize_columns()
+        
+        if on_loaded:
+            on_loaded()
+
+    def format_row(self, i, row):
+        """Build the Treeview values and tags for row number i of the current tab."""
         # Mapping from DB index to column name
         # DB: id, detalle, tipo_acceso, acceso_host, puerto, usuario, password, rol, contiene, instancia_tipo, ip_priv, ip_pub, row_color
         # Cols: ("ID", "Detalle / SID", "Tipo acceso", "HOST / IP / DNS", "Puerto", "User", "Pass", "Rol", "Contiene", "Instancia / Tipo", "IP Priv", "IP Pub")
-        
-        db_idx_to_col = [
-            "ID", "Detalle / SID", "Tipo acceso", "HOST / IP / DNS", "Puerto", "User", "Pass", "Rol", "Contiene", "Instancia / Tipo", "IP Priv", "IP Pub"
-        ]
-
-        for i, row in enumerate(rows):
-            # Extract row_color (last element) before processing
-            row_color = row[12] if len(row) > 12 else None
-            
-            # Process only the first 12 elements (exclude row_color)
-            safe_row = list(row[:12])  # Convert tuple to list to modify
-            
-            # Apply masking
-            for idx, val in enumerate(safe_row):
-                if val is None or val == "":
-                    safe_row[idx] = ""
-                else:
-                    col_name = db_idx_to_col[idx]
-                    if col_name != "ID" and not self.col_visible.get(col_name, True):
-                        safe_row[idx] = "******"
-
-            # Determine tag based on separator status
-            # Check if this is a separator row (all fields empty except ID)
-            is_separator = all(not val or val == "" for idx, val in enumerate(safe_row) if idx > 0)
-            
-            # Build tags list
-            tags = []
-            
-            if is_separator and safe_row[0]:  # Has ID but all other fields empty
-                tags.append('separator')
-            else:
-                # Add alternating row background
-                if i % 2 != 0:
-                    tags.append('oddrow')
-                
-                # Add custom color tag if row has a color
-                if row_color and row_color.startswith('#'):  # Only process valid hex colors
-                    # Create a unique tag for this color
-                    color_tag = f"color_{row_color.replace('#', '')}"
-                    # Configure tag if not already configured
-                    if color_tag not in self.configured_color_tags:
-                        self.tree.tag_configure(color_tag, foreground=row_color)
-                        self.configured_color_tags.add(color_tag)
-                    tags.append(color_tag)
+        db_idx_to_col = COLUMNS
+
+        # Extract row_color (last element) before processing
+        row_color = row[12] if len(row) > 12 else None
+        
+        # Only visible columns are read: masked fields of lazy rows stay encrypted
+        safe_row = [row[0]] + [""] * (len(db_idx_to_col) - 1)
+        for idx in range(1, len(db_idx_to_col)):
+            if self.col_visible.get(db_idx_to_col[idx], True):
+                val = row[idx]
+                if val is not None and val != "":
+                    safe_row[idx] = val
+            elif not _is_blank(row, idx):
+                safe_row[idx] = "******"
+
+        # Determine tag based on separator status
+        # Check if this is a separator row (all fields empty except ID)
+        is_separator = not any(safe_row[1:])
+        
+        # Build tags list
+        tags = []
+        
+        if is_separator and safe_row[0]:  # Has ID but all other fields empty
+            tags.append('separator')
+        else:
+            # Add alternating row background
+            if i % 2 != 0:
+                tags.append('oddrow')
             
-            self.tree.insert("", tk.END, values=safe_row, tags=tuple(tags))
-        
-        # Auto-resize columns after loading data
+            # Add custom color tag if row has a color
+            if row_color and row_color.startswith('#'):  # Only process valid hex colors
+                # Create a unique tag for this color
+                color_tag = f"color_{row_color.replace('#', '')}"
+                # Configure tag if not already configured
+                if color_tag not in self.configured_color_tags:
+                    self.tree.tag_configure(color_tag, foreground=row_color)
+                    self.configured_color_tags.add(color_tag)
+                tags.append(color_tag)
+        
+        return safe_row, tuple(tags)
+
+    def insert_next_page(self):
+        """Insert the next TREE_PAGE_SIZE rows of the current tab. Returns False when all are loaded."""
+        self._page_job = None
+        start = self.tree_loaded_count
+        end = min(start + TREE_PAGE_SIZE, len(self.tab_rows))
+        if start >= end:
+            return False
+        
+        for i in range(start, end):
+            row = self.tab_rows[i]
+            values, tags = self.format_row(i, row)
+            self.tree.insert("", tk.END, iid=str(row[0]), values=values, tags=tags)
+            self.width_cache.add(values)
+        self.tree_loaded_count = end
+        return True
+
+    def on_tree_yscroll(self, first, last):
+        """Scrollbar hook: page in more rows when the viewport gets near the last loaded one."""
+        self.v_scrollbar.set(first, last)
+        if (float(last) >= TREE_PREFETCH_FRACTION and self._page_job is None
+                and self.tree_loaded_count < len(self.tab_rows)):
+            self._page_job = self.root.after_idle(self.insert_next_page)
+
+    def select_record(self, record_id):
+        """Select and scroll to a record, paging it in if it is not loaded yet."""
+        return self.select_records([record_id])
+
+    def select_records(self, record_ids):
+        """
+        Select several records of the current tab and scroll to the first one.
+        
+        Rows not loaded yet are paged in one page per idle callback, so a
+        record deep in a large tab does not freeze the window.
+        """
+        wanted = {str(record_id) for record_id in record_ids}
+        item_ids = [str(row[0]) for row in self.tab_rows if str(row[0]) in wanted]
+        if not item_ids:
+            return False
+        
+        if self._select_job is not None:
+            self.root.after_cancel(self._select_job)
+        generation = self._load_generation
+        
+        def page_in():
+            self._select_job = None
+            if generation != self._load_generation:
+                return # Another tab or a reload replaced the rows
+            if not self.tree.exists(item_ids[-1]) and self.insert_next_page():
+                self._select_job = self.root.after_idle(page_in)
+                return
+            loaded = [item_id for item_id in item_ids if self.tree.exists(item_id)]
+            if loaded:
+                self.tree.selection_set(loaded)
+                self.tree.see(loaded[0])
+        
+        page_in()
+        return True
+
+    # --- Cambios de una sola fila (sin recargar la pestaña) ---
+    # Los items del Treeview usan el id del registro como iid, y las filas
+    # cargadas son siempre tab_rows[:tree_loaded_count] en el mismo orden.
+    # tab_rows es una copia propia de la UI: el worker arma la nueva después de
+    # cada escritura y la anterior sirve para saber qué se mostraba.
+    def submit_row_change(self, write, *args, on_done, on_written=None):
+        """
+        Run a write on the worker, then on_done(result, rows) on the Tk thread.
+
+        rows is a copy of the tab's rows read on the worker right after the
+        write, since the DB cache list is patched there. on_done is skipped if
+        the tab was switched or reloaded since the submit: that load was queued
+        after the write and already shows it. on_written(result) runs in any case.
+        """
+        tab_id, generation = self.current_tab_id, self._load_generation
+
+        def write_and_read():
+            return write(*args), self.db.get_credentials(tab_id, self.encryption_manager)
+
+        def done(outcome):
+            result, rows = outcome
+            if on_written:
+                on_written(result)
+            if tab_id == self.current_tab_id and generation == self._load_generation:
+                on_done(result, rows)
+
+        self.tasks.submit(write_and_read, on_done=done)
+
+    def apply_row_added(self, record_id, rows):
+        """Show a row just appended to the current tab."""
+        self.tab_rows = rows
+        index = len(rows) - 1
+        # If the table is not fully paged in, the row will show up on scroll
+        if index == self.tree_loaded_count:
+            self.insert_next_page()
+            self.auto_resize_columns()
+
+    def apply_row_updated(self, record_id, rows):
+        """Re-render one row after its data or color changed."""
+        old_rows, self.tab_rows = self.tab_rows, rows
+        item_id = str(record_id)
+        if not self.tree.exists(item_id):
+            return
+        index = self.tree.index(item_id)
+        old_values, _ = self.format_row(index, old_rows[index])
+        values, tags = self.format_row(index, rows[index])
+        self.width_cache.remove(old_values)
+        self.width_cache.add(values)
+        self.tree.item(item_id, values=values, tags=tags)
         self.auto_resize_columns()
 
+    def apply_row_deleted(self, record_id, rows):
+        """Remove one row from the table and fix the stripes of the rows below it."""
+        old_rows, self.tab_rows = self.tab_rows, rows
+        item_id = str(record_id)
+        if not self.tree.exists(item_id):
+            return
+        index = self.tree.index(item_id)
+        old_values, _ = self.format_row(index, old_rows[index])
+        self.width_cache.remove(old_values)
+        self.tree.delete(item_id)
+        self.tree_loaded_count -= 1
+        self.restripe_rows(index, self.tree_loaded_count)
+        self.auto_resize_columns()
+
+    def apply_rows_swapped(self, record_id, other_id, rows):
+        """Swap two loaded rows in place and keep the moved one selected."""
+        self.tab_rows = rows
+        item_id, other_item = str(record_id), str(other_id)
+        index, other_index = self.tree.index(item_id), self.tree.index(other_item)
+        # The row that was below takes the upper position
+        lower_item = item_id if index > other_index else other_item
+        first = min(index, other_index)
+        self.tree.move(lower_item, "", first)
+        self.restripe_rows(first, first + 2)
+        self.tree.selection_set(item_id)
+        self.tree.see(item_id)
+
+    def loaded_row(self, record_id):
+        """
+        Row of a record shown in the table, or None.
+        
+        Read from the UI's own tab_rows, never from the DB: on the Tk thread a
+        cache miss would read and decrypt the whole tab.
+        """
+        item_id = str(record_id)
+        if not self.tree.exists(item_id):
+            return None
+        return self.tab_rows[self.tree.index(item_id)]
+
+    def restripe_rows(self, start, end):
+        """Recompute the tags (alternating stripes) of the loaded rows in [start, end)."""
+        for i in range(start, min(end, self.tree_loaded_count)):
+            row = self.tab_rows[i]
+            _, tags = self.format_row(i, row)
+            self.tree.item(str(row[0]), tags=tags)
+
     def auto_resize_columns(self):
         """Automatically resize columns based on content and header text"""
-        import tkinter.font as tkfont
-        
-        # Get default font for measuring text
-        font = tkfont.Font()
-        
-        columns = self.tree["columns"]
-        
-        for col in columns:
-            # Start with header width
+        for col in self.tree["columns"]:
+            # Widest of header and cells, from the width cache
             header_text = self.tree.heading(col, "text")
-            max_width = font.measure(str(header_text)) + 20  # Add padding
-            
-            # Check all rows for this column
-            for item in self.tree.get_children():
-                values = self.tree.item(item, "values")
-                col_index = columns.index(col)
-                
-                if col_index < len(values):
-                    cell_value = str(values[col_index])
-                    cell_width = font.measure(cell_value) + 20  # Add padding
-                    max_width = max(max_width, cell_width)
+            max_width = self.width_cache.content_width(col, header_text)
             
             # Set minimum and maximum widths
             max_width = max(50, min(max_width, 400))  # Between 50 and 400 pixels
@@ -765,27 +1095,13 @@ class MainApp:
         # Calculate available width (subtract scrollbar width)
         available_width = tree_width - 20
         
-        # Get current column widths (based on content)
-        import tkinter.font as tkfont
-        font = tkfont.Font()
-        
+        # Get current column widths (based on content, from the width cache)
         col_widths = {}
         total_content_width = 0
         
         for col in visible_columns:
-            # Start with header width
             header_text = self.tree.heading(col, "text")
-            max_width = font.measure(str(header_text)) + 20
-            
-            # Check all rows for this column
-            for item in self.tree.get_children():
-                values = self.tree.item(item, "values")
-                col_index = columns.index(col)
-                
-                if col_index < len(values):
-                    cell_value = str(values[col_index])
-                    cell_width = font.measure(cell_value) + 20
-                    max_width = max(max_width, cell_width)
+            max_width = self.width_cache.content_width(col, header_text)
             
             # Set minimum width
             max_width = max(50, max_width)
@@ -811,6 +1127,22 @@ class MainApp:
                 final_width = min(col_widths[col], 400)
                 self.tree.column(col, width=final_width)
 
+    def show_progress(self, done, total, text=""):
+        """Show/update the progress bar for long operations."""
+        if not self.progress_frame.winfo_ismapped():
+            self.progress_frame.pack(side=tk.RIGHT, padx=5)
+        if total is None:
+            # Unknown size (streaming import, migration)
+            self.progress_bar.config(mode="indeterminate")
+            self.progress_bar.step(5)
+            self.progress_label.config(text=f"{text} {done or ''}".strip())
+        else:
+            self.progress_bar.config(mode="determinate", maximum=max(total, 1), value=done)
+            self.progress_label.config(text=f"{text} {done}/{total}".strip())
+
+    def hide_progress(self):
+        self.progress_frame.pack_forget()
+
     def clear_inputs(self):
         for entry in self.entries.values():
             entry.delete(0, tk.END)
@@ -860,14 +1192,14 @@ class MainApp:
         
         col_name_raw = all_columns[col_index]
         
-        # Get the values from the selected row
-        values = self.tree.item(item_id, "values")
-        
-        if col_index >= len(values):
+        # Get the values from the record (masked columns are decrypted only now)
+        record = self.loaded_row(item_id)
+        if record is None or col_index >= len(COLUMNS):
             return
             
-        text_to_copy = str(values[col_index])
-        detail = values[1] if len(values) > 1 else "Unknown"
+        value = record[col_index]
+        text_to_copy = "" if value is None else str(value)
+        detail = record[1] or "Unknown"
         
         # Clean column name by removing visibility icons
         col_name = col_name_raw.replace("👁", "").replace("🔒", "").strip()
@@ -918,8 +1250,9 @@ class MainApp:
         if not row_id:
             return
         
-        # Select the row
-        self.tree.selection_set(row_id)
+        # Select the row (keep a multiple selection that includes it)
+        if row_id not in self.tree.selection():
+            self.tree.selection_set(row_id)
         
         # Get the record ID
         item = self.tree.item(row_id)
@@ -934,6 +1267,13 @@ class MainApp:
         menu.add_command(label="Cambiar Color de Texto", command=lambda: self.open_row_color_picker(record_id))
         menu.add_separator()
         menu.add_command(label="Quitar Color", command=lambda: self.set_row_color(record_id, None))
+        menu.add_separator()
+        menu.add_command(label="Mover a posición...", command=self.ask_move_position)
+        tabs_menu = tk.Menu(menu, tearoff=0)
+        for tab_id, tab_name, _ in self.db.get_tabs():
+            if tab_id != self.current_tab_id:
+                tabs_menu.add_command(label=tab_name, command=lambda t=tab_id: self.move_selection(0, t))
+        menu.add_cascade(label="Mover a pestaña", menu=tabs_menu)
         
         # Show menu at cursor position
         menu.post(event.x_root, event.y_root)
@@ -967,11 +1307,12 @@ class MainApp:
     
     def set_row_color(self, record_id, color):
         """Set the color marking for a row."""
-        self.db.update_row_color(record_id, color)
-        self.load_data()  # Reload to apply color
+        # Re-render only this row once saved
+        self.submit_row_change(self.db.update_row_color, record_id, color,
+                               on_done=lambda _, rows: self.apply_row_updated(record_id, rows))
 
     def change_master_password(self):
-        dialog, theme = self.create_styled_toplevel("Cambiar Contraseña Maestra", 300, 300)
+        dialog, theme = self.create_styled_toplevel("Cambiar Contraseña Maestra", 300, 320)
         
         tk.Label(dialog, text="Contraseña Actual:", bg=theme["bg"], fg=theme["fg"]).pack(pady=5)
         curr_pass = tk.Entry(dialog, show="*", bg=theme["entry_bg"], fg=theme["entry_fg"], insertbackground=theme["fg"])
@@ -998,17 +1339,88 @@ class MainApp:
                 messagebox.showwarning("Error", "Las nuevas contraseñas no coinciden")
                 return
 
-            # Verify current
-            stored_hash = SecurityManager.get_master_hash(self.db)
-            if SecurityManager.verify_password(current, stored_hash):
-                SecurityManager.set_master_password(self.db, new)
-                messagebox.showinfo("Éxito", "Contraseña maestra actualizada")
+            # The current password is verified by unlocking with it (one KDF, off
+            # the UI thread); the dialog stays modal meanwhile
+            dialog.grab_set()
+            save_btn.config(state=tk.DISABLED)
+            
+            def change():
+                if SecurityManager.unlock(current, self.db) is None:
+                    return None
+                return SecurityManager.change_master_password(self.db, self.encryption_manager, new)
+            
+            def changed(manager):
+                if manager is None:
+                    dialog.grab_release()
+                    save_btn.config(state=tk.NORMAL)
+                    messagebox.showerror("Error", "La contraseña actual es incorrecta")
+                    curr_pass.delete(0, tk.END)
+                    return
+                # Same data key: the cached tabs and the search index stay valid
                 dialog.destroy()
-            else:
-                messagebox.showerror("Error", "La contraseña actual es incorrecta")
-                curr_pass.delete(0, tk.END)
+                self.finish_task("Éxito", "Contraseña maestra actualizada")
+            
+            def failed(error):
+                dialog.grab_release()
+                save_btn.config(state=tk.NORMAL)
+                self.fail_task("Error al cambiar la contraseña", error)
+            
+            self.tasks.submit(change, on_done=changed, on_error=failed)
+
+        save_btn = tk.Button(dialog, text="Guardar", bg="#4CAF50", fg="white", command=save)
+        save_btn.pack(pady=15)
+
+    def set_diagnostics(self, enabled):
+        """Toggle the instrumentation right away; the setting is saved on the worker."""
+        diagnostics.apply(enabled)
+        self.tasks.submit(diagnostics.save, self.db, enabled)
+
+    def show_diagnostics(self):
+        """Hidden dialog (Ctrl+Shift+D) with call counts and latencies of the hot paths."""
+        dialog, theme = self.create_styled_toplevel("Diagnóstico", 720, 420)
+
+        enabled = tk.BooleanVar(value=diagnostics.is_enabled())
+        tk.Checkbutton(dialog, text="Medir operaciones (se guarda en la configuración)", variable=enabled,
+                       command=lambda: self.set_diagnostics(enabled.get()),
+                       bg=theme["bg"], fg=theme["fg"], selectcolor=theme["entry_bg"],
+                       activebackground=theme["bg"]).pack(anchor=tk.W, padx=10, pady=5)
+
+        columns = ("Operación", "Llamadas", "Total ms", "Media ms", "p50 ms", "p95 ms", "Máx ms")
+        table = ttk.Treeview(dialog, columns=columns, show="headings", height=14)
+        for col in columns:
+            table.heading(col, text=col)
+            table.column(col, width=240 if col == "Operación" else 70, anchor=tk.W if col == "Operación" else tk.E)
+        table.pack(fill=tk.BOTH, expand=True, padx=10)
+
+        def refresh():
+            table.delete(*table.get_children())
+            for name, stats in diagnostics.metrics.snapshot().items():
+                table.insert("", "end", values=(name, stats["calls"], stats["total_ms"], stats["mean_ms"],
+                                                stats["p50_ms"], stats["p95_ms"], stats["max_ms"]))
+
+        def reset():
+            diagnostics.metrics.reset()
+            refresh()
+
+        def export():
+            filename = filedialog.asksaveasfilename(
+                parent=dialog,
+                defaultextension=".json",
+                filetypes=[("JSON Files", "*.json"), ("All Files", "*.*")],
+                title="Exportar diagnóstico"
+            )
+            if not filename:
+                return
+            with open(filename, "w", encoding="utf-8") as file:
+                file.write(diagnostics.metrics.to_json(enabled=diagnostics.is_enabled(),
+                                                       rows_in_tab=len(self.tab_rows)) + "\n")
+
+        buttons = tk.Frame(dialog, bg=theme["bg"])
+        buttons.pack(pady=10)
+        for text, command in (("Actualizar", refresh), ("Reiniciar", reset), ("Exportar JSON", export), ("Cerrar", dialog.destroy)):
+            tk.Button(buttons, text=text, command=command, bg=theme["btn_bg"], fg=theme["btn_fg"], width=12).pack(side=tk.LEFT, padx=5)
 
-        tk.Button(dialog, text="Guardar", bg="#4CAF50", fg="white", command=save).pack(pady=15)
+        refresh()
 
     def export_to_csv(self):
         filename = filedialog.asksaveasfilename(
@@ -1019,31 +1431,11 @@ class MainApp:
         if not filename:
             return
 
-        try:
-            # Get all tabs
-            tabs = self.db.get_tabs()
-            # Map tab_id to name
-            tab_map = {t[0]: t[1] for t in tabs}
-
-            with open(filename, mode='w', newline='', encoding='utf-8') as file:
-                writer = csv.writer(file)
-                # Header
-                headers = ["Pestaña", "Detalle / SID", "Tipo acceso", "HOST / IP / DNS", "Puerto", "User", "Pass", "Rol", "Contiene", "Instancia / Tipo", "IP Priv", "IP Pub"]
-                writer.writerow(headers)
-
-                # Iterate tabs to get all data
-                for tab_id, tab_name, _ in tabs:
-                    creds = self.db.get_credentials(tab_id, self.encryption_manager)
-                    # creds structure: (id, detalle, tipo_acceso, acceso_host, puerto, usuario, password, rol, contiene, instancia_tipo, ip_priv, ip_pub)
-                    for row in creds:
-                        # Construct row for CSV: TabName + data fields (skipping ID)
-                        csv_row = [tab_name] + list(row[1:])
-                        writer.writerow(csv_row)
-            
-            messagebox.showinfo("Exportar", f"Datos exportados correctamente a {filename}")
-
-        except Exception as e:
-            messagebox.showerror("Error", f"Error al exportar: {str(e)}")
+        self.show_progress(0, None, "Exportando")
+        self.tasks.submit(export_csv, self.db, filename, self.encryption_manager,
+                          on_progress=lambda done, total: self.show_progress(done, total, "Exportando"),
+                          on_done=lambda count: self.finish_task("Exportar", f"{count} registros exportados correctamente a {filename}"),
+                          on_error=lambda e: self.fail_task("Error al exportar", e))
 
     def import_from_csv(self):
         filename = filedialog.askopenfilename(
@@ -1057,89 +1449,31 @@ class MainApp:
         if not confirm:
             return
 
-        try:
-            with open(filename, mode='r', newline='', encoding='utf-8') as file:
-                reader = csv.reader(file)
-                try:
-                    header = next(reader)
-                except StopIteration:
-                    messagebox.showwarning("Importar", "El archivo CSV está vacío.")
-                    return
+        # Find current tab name (used for rows without the "Pestaña" column)
+        current_tab_name = "Principal"
+        for tid, tname, _ in self.db.get_tabs():
+            if tid == self.current_tab_id:
+                current_tab_name = tname
+                break
 
-                # Check if first column is "Pestaña"
-                has_tab_col = header[0].lower() == "pestaña" or header[0].lower() == "tab"
-                
-                # If we don't find a tab column, we might assume current tab? 
-                # Let's assume standard format matches export: 
-                # ["Pestaña", "Detalle / SID", "Tipo acceso", "HOST / IP / DNS", "Puerto", "User", "Pass", "Rol", "Contiene", "Instancia / Tipo", "IP Priv", "IP Pub"]
-                # 12 columns total.
-                
-                count = 0
-                
-                # Cache tabs to avoid DB hits if possible, but we might create new ones.
-                # Just simplify: get tabs map at start, update if we create one.
-                current_tabs = {name: tid for tid, name, _ in self.db.get_tabs()}
-                
-                for row in reader:
-                    if not row: continue
-                    
-                    if has_tab_col:
-                        tab_name = row[0]
-                        data_start_idx = 1
-                    else:
-                        # Fallback to current tab if no tab column? 
-                        # Or user just provided data. Let's assume current tab if structure allows or if header implies it.
-                        # For safety, let's Stick to the Export format.
-                        # But for robustness, if column count is 11 (data only), use current tab.
-                        if len(row) == 11:
-                            # Find current tab name
-                            current_tab_name = "Principal"
-                            for tid, tname, _ in self.db.get_tabs():
-                                if tid == self.current_tab_id:
-                                    current_tab_name = tname
-                                    break
-                            tab_name = current_tab_name
-                            data_start_idx = 0
-                        else:
-                            # Maybe it has 12 cols and first is tab?
-                            tab_name = row[0]
-                            data_start_idx = 1
-                    
-                    # Ensure tab exists
-                    if tab_name not in current_tabs:
-                        # Create tab with a random or default color
-                        # Simple hash for color or just random? Let's pick standard Grey
-                        self.db.add_tab(tab_name, "#E0E0E0")
-                        # Refresh cache
-                        current_tabs = {name: tid for tid, name, _ in self.db.get_tabs()}
-                    
-                    target_tab_id = current_tabs[tab_name]
-                    
-                    # Extract data
-                    file_data = row[data_start_idx:]
-                    
-                    # Ensure we have 11 fields
-                    required_fields = 11
-                    if len(file_data) < required_fields:
-                        file_data = file_data + ([""] * (required_fields - len(file_data)))
-                    elif len(file_data) > required_fields:
-                        file_data = file_data[:required_fields]
-                        
-                    # Add tab_id to data for DB insertion
-                    # DB add_credential expects: (detalle, tipo_acceso, acceso_host, puerto, usuario, password, rol, contiene, instancia_tipo, ip_priv, ip_pub, tab_id)
-                    # All of these are in file_data in that order.
-                    
-                    final_data = tuple(file_data) + (target_tab_id,)
-                    
-                    self.db.add_credential(final_data, self.encryption_manager)
-                    count += 1
-
-            messagebox.showinfo("Importar", f"Se importaron {count} registros correctamente.")
+        def imported(result):
+            count, rate = result
+            self.hide_progress()
+            # Se reconstruye la próxima vez que se use el buscador
+            self.update_search_index(self.search_index.clear)
+            if count == 0:
+                messagebox.showwarning("Importar", "El archivo CSV está vacío.")
+                return
+
+            messagebox.showinfo("Importar", f"Se importaron {count} registros correctamente ({rate:,.0f} filas/s).")
             self.load_tabs() # In case new tabs were created
             self.load_data()
 
-        except Exception as e:
-             messagebox.showerror("Error", f"Error al importar: {str(e)}")
+        self.show_progress(0, None, "Importando")
+        self.tasks.submit(import_csv, self.db, filename, self.encryption_manager, current_tab_name,
+                          on_progress=lambda done: self.show_progress(done, None, "Importando"),
+                          on_done=imported,
+                          on_error=lambda e: self.fail_task("Error al importar", e))
     
     def move_entry_up(self):
         """Mover la entrada seleccionada hacia arriba en el orden."""
@@ -1152,18 +1486,14 @@ class MainApp:
         record_id = item['values'][0]
         
         # Intentar mover
-        success = self.db.move_entry_up(record_id, self.current_tab_id)
+        def moved(neighbour_id, rows):
+            if neighbour_id:
+                # Intercambiar solo las dos filas afectadas (sigue seleccionada)
+                self.apply_rows_swapped(record_id, neighbour_id, rows)
+            else:
+                messagebox.showinfo("Info", "La entrada ya está en la primera posición")
         
-        if success:
-            self.load_data()
-            # Re-seleccionar el item movido
-            for item_id in self.tree.get_children():
-                if self.tree.item(item_id)['values'][0] == record_id:
-                    self.tree.selection_set(item_id)
-                    self.tree.see(item_id)
-                    break
-        else:
-            messagebox.showinfo("Info", "La entrada ya está en la primera posición")
+        self.submit_row_change(self.db.move_entry_up, record_id, self.current_tab_id, on_done=moved)
     
     def move_entry_down(self):
         """Mover la entrada seleccionada hacia abajo en el orden."""
@@ -1175,17 +1505,85 @@ class MainApp:
         item = self.tree.item(selected[0])
         record_id = item['values'][0]
         
+        # La fila de abajo tiene que estar cargada en la tabla antes de intercambiarlas
+        if self.tree.index(selected[0]) + 1 >= self.tree_loaded_count:
+            self.insert_next_page()
+        
         # Intentar mover
-        success = self.db.move_entry_down(record_id, self.current_tab_id)
+        def moved(neighbour_id, rows):
+            if neighbour_id:
+                # Intercambiar solo las dos filas afectadas (sigue seleccionada)
+                self.apply_rows_swapped(record_id, neighbour_id, rows)
+            else:
+                messagebox.showinfo("Info", "La entrada ya está en la última posición")
         
-        if success:
-            self.load_data()
-            # Re-seleccionar el item movido
-            for item_id in self.tree.get_children():
-                if self.tree.item(item_id)['values'][0] == record_id:
-                    self.tree.selection_set(item_id)
-                    self.tree.see(item_id)
-                    break
-        else:
-            messagebox.showinfo("Info", "La entrada ya está en la última posición")
+        self.submit_row_change(self.db.move_entry_down, record_id, self.current_tab_id, on_done=moved)
+
+    def move_selection(self, position, tab_id=None):
+        """Mover las filas seleccionadas a la posición `position` (0 = primera) de una pestaña."""
+        record_ids = [int(item_id) for item_id in self.tree.selection()]
+        if not record_ids:
+            messagebox.showwarning("Error", "Selecciona una fila para mover")
+            return
+        
+        target_tab = self.current_tab_id if tab_id is None else tab_id
+        
+        def moved(moved_ids):
+            if target_tab != self.current_tab_id:
+                self.update_search_index(self.search_index.move_to_tab, moved_ids, target_tab)
+                self.load_data()
+            else:
+                # The tab cache is already reordered: this reload does not decrypt
+                self.load_data(on_loaded=lambda: self.select_records(moved_ids))
+        
+        self.tasks.submit(self.db.move_entries, record_ids, target_tab, position, on_done=moved)
+
+    def ask_move_position(self):
+        """Pedir la posición destino (1 = primera) para las filas seleccionadas."""
+        dialog, theme = self.create_styled_toplevel("Mover a posición", 300, 150)
+
+        tk.Label(dialog, text=f"Posición (1 - {len(self.tab_rows)}):", bg=theme["bg"], fg=theme["fg"]).pack(pady=10)
+        entry = tk.Entry(dialog, bg=theme["entry_bg"], fg=theme["entry_fg"], insertbackground=theme["fg"])
+        entry.pack(pady=5)
+        entry.focus()
+        
+        def move():
+            try:
+                position = int(entry.get())
+            except ValueError:
+                messagebox.showwarning("Error", "Ingrese un número de posición")
+                return
+            dialog.destroy()
+            self.move_selection(max(position, 1) - 1)
+
+        tk.Button(dialog, text="Mover", bg="#4CAF50", fg="white", command=move).pack(pady=10)
+        dialog.bind('<Return>', lambda e: move())
+
+    # --- Arrastrar y soltar ---
+    def on_drag_start(self, event):
+        self._drag_item = self.tree.identify_row(event.y) or None
+        self._dragging = False
+
+    def on_drag_motion(self, event):
+        if self._drag_item and self.tree.identify_row(event.y) not in ("", self._drag_item):
+            self._dragging = True
+            self.tree.config(cursor="exchange")
+
+    def on_drag_drop(self, event):
+        """Soltar la selección sobre otra fila: se ubica en el lugar de esa fila."""
+        dragging, drag_item = self._dragging, self._drag_item
+        self._drag_item = None
+        self._dragging = False
+        self.tree.config(cursor="")
+        target = self.tree.identify_row(event.y)
+        selection = self.tree.selection()
+        if not dragging or not target or target in selection or drag_item not in selection:
+            return
+        
+        target_index = self.tree.index(target)
+        # Position among the rows that stay; dropping downwards lands after the target
+        position = target_index - sum(1 for item_id in selection if self.tree.index(item_id) < target_index)
+        if target_index > self.tree.index(drag_item):
+            position += 1
+        self.move_selection(position)
 
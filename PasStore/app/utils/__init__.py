@@ -1 +1,7 @@
-from .security import SecurityManager
+# Re-export on first access: importing app.utils.tasks or app.utils.diagnostics
+# must not pull in cryptography (login paints before it is needed)
+def __getattr__(name):
+    if name == "SecurityManager":
+        from .security import SecurityManager
+        return SecurityManager
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,210 @@
+import bisect
+import functools
+import json
+import sys
+import threading
+import time
+import types
+from datetime import datetime, timezone
+
+# Instrumentación opcional de los caminos calientes (DB, cripto, tabla).
+# Se activa con el setting "diagnostics" = "1"; apagada no queda ningún
+# wrapper instalado, las clases conservan sus métodos originales.
+DIAGNOSTICS_SETTING = "diagnostics"
+
+# Métodos medidos, por clase (None = todos los métodos públicos). Solo se
+# instrumentan los módulos ya importados, así el CLI no arrastra Tk.
+TARGETS = {
+    "app.data.database.DatabaseManager": None,
+    # _decrypt_field is what LazyRecord calls for each field read (the table's hot path)
+    "app.utils.encryption.EncryptionManager": ("encrypt", "decrypt", "_decrypt_field", "seal_credential",
+                                               "unseal_credential", "decrypt_record", "decrypt_rows", "derive_key"),
+    "app.ui.column_widths.ColumnWidthCache": ("measure",),
+    "app.ui.main_window.MainApp": ("load_data", "show_rows", "insert_next_page", "auto_resize_columns", "_do_resize"),
+}
+
+# Límites superiores (ms) de los buckets del histograma; el último es abierto
+BUCKETS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+
+class Metrics:
+    """
+    Thread-safe call counts and latency histograms, keyed by operation name.
+
+    Each operation keeps a count, total/max time and counts per BUCKETS_MS
+    bucket, so recording is O(log buckets) and memory does not grow with calls.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, name, seconds):
+        ms = seconds * 1000
+        bucket = bisect.bisect_left(BUCKETS_MS, ms)
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = [0, 0.0, 0.0, [0] * (len(BUCKETS_MS) + 1)]
+            stats[0] += 1
+            stats[1] += ms
+            stats[2] = max(stats[2], ms)
+            stats[3][bucket] += 1
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    def snapshot(self):
+        """
+        Current metrics, slowest total first.
+
+        Returns:
+            dict: name -> {calls, total_ms, mean_ms, p50_ms, p95_ms, max_ms, histogram}
+                (percentiles are bucket upper bounds, capped at max_ms)
+        """
+        with self._lock:
+            items = [(name, count, total, peak, list(buckets))
+                     for name, (count, total, peak, buckets) in self._stats.items()]
+
+        result = {}
+        for name, count, total, peak, buckets in sorted(items, key=lambda item: -item[2]):
+            labels = [f"<={bound}ms" for bound in BUCKETS_MS] + [f">{BUCKETS_MS[-1]}ms"]
+            result[name] = {
+                "calls": count,
+                "total_ms": round(total, 3),
+                "mean_ms": round(total / count, 3),
+                "p50_ms": _percentile(buckets, count, 0.50, peak),
+                "p95_ms": _percentile(buckets, count, 0.95, peak),
+                "max_ms": round(peak, 3),
+                "histogram": {label: n for label, n in zip(labels, buckets) if n},
+            }
+        return result
+
+    def to_json(self, **extra):
+        report = {"timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"), **extra,
+                  "unit": "ms", "metrics": self.snapshot()}
+        return json.dumps(report, indent=2)
+
+
+def _percentile(buckets, count, fraction, peak):
+    seen = 0
+    for bound, n in zip(BUCKETS_MS, buckets):
+        seen += n
+        if seen >= count * fraction:
+            return round(min(bound, peak), 3)
+    return round(peak, 3)
+
+
+metrics = Metrics()
+
+# inspect.CO_GENERATOR, sin importar inspect (este módulo se carga al iniciar)
+_CO_GENERATOR = 0x20
+
+# (clase, nombre) -> atributo original, para restaurarlo al desactivar
+_installed = {}
+_enabled = False
+
+
+def _timed(name, fn):
+    if fn.__code__.co_flags & _CO_GENERATOR:
+        # Only the time spent inside the generator, not in the consumer
+        @functools.wraps(fn)
+        def generator_wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            gen = fn(*args, **kwargs)
+            elapsed = time.perf_counter() - start
+            try:
+                while True:
+                    start = time.perf_counter()
+                    try:
+                        item = next(gen)
+                    finally:
+                        elapsed += time.perf_counter() - start
+                    yield item
+            except StopIteration as stop:
+                return stop.value
+            finally:
+                gen.close()
+                metrics.record(name, elapsed)
+        return generator_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            metrics.record(name, time.perf_counter() - start)
+    return wrapper
+
+
+def _resolve(path):
+    """Class for a dotted path, or None if its module was not imported yet."""
+    module_name, _, class_name = path.rpartition(".")
+    module = sys.modules.get(module_name)
+    return getattr(module, class_name, None) if module is not None else None
+
+
+def _method_names(cls, names):
+    if names is not None:
+        return names
+    return [name for name, value in vars(cls).items()
+            if not name.startswith("_") and isinstance(value, (types.FunctionType, staticmethod, classmethod))]
+
+
+def enable():
+    """Wrap the TARGETS methods of the loaded modules (idempotent: call again after importing more)."""
+    global _enabled
+    _enabled = True
+    for path, names in TARGETS.items():
+        cls = _resolve(path)
+        if cls is None:
+            continue
+        for name in _method_names(cls, names):
+            if (cls, name) in _installed:
+                continue
+            original = vars(cls)[name]
+            label = f"{cls.__name__}.{name}"
+            if isinstance(original, staticmethod):
+                wrapped = staticmethod(_timed(label, original.__func__))
+            elif isinstance(original, classmethod):
+                wrapped = classmethod(_timed(label, original.__func__))
+            else:
+                wrapped = _timed(label, original)
+            _installed[(cls, name)] = original
+            setattr(cls, name, wrapped)
+
+
+def disable():
+    """Restore the original methods; recorded metrics are kept."""
+    global _enabled
+    _enabled = False
+    for (cls, name), original in _installed.items():
+        setattr(cls, name, original)
+    _installed.clear()
+
+
+def is_enabled():
+    return _enabled
+
+
+def is_enabled_in(db):
+    return db.get_setting(DIAGNOSTICS_SETTING) == "1"
+
+
+def apply(enabled):
+    if enabled:
+        enable()
+    else:
+        disable()
+
+
+def configure(db):
+    """Enable or disable the instrumentation according to the settings key."""
+    apply(is_enabled_in(db))
+
+
+def save(db, enabled):
+    """Persist the settings key (a DB write: the UI runs it on its worker)."""
+    db.set_setting(DIAGNOSTICS_SETTING, "1" if enabled else "0")
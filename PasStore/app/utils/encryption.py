@@ -1,51 +1,164 @@
 import base64
+import json
 import os
+import time
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from cryptography.hazmat.primitives.kdf.scrypt import Scrypt
 from cryptography.fernet import Fernet
 
 
+# Parámetros del KDF (se guardan en settings como JSON); estos son los de las
+# bóvedas anteriores, que no tenían parámetros guardados
+DEFAULT_KDF_PARAMS = {"algorithm": "pbkdf2-sha256", "iterations": 100000}
+
+# Calibración: tiempo objetivo de desbloqueo y límites de iteraciones PBKDF2
+KDF_TARGET_MS = 300
+KDF_MIN_ITERATIONS = 50000
+KDF_MAX_ITERATIONS = 20000000
+KDF_BENCHMARK_ITERATIONS = 20000
+
+# Filas desencriptadas: (id, 11 campos, row_color); la contraseña (6) no se
+# guarda desencriptada en LazyRecord, se desencripta en cada acceso
+RECORD_LENGTH = 13
+UNCACHED_FIELDS = (6,)
+
+
 class EncryptionManager:
     """Manages encryption and decryption of sensitive credential data using Fernet symmetric encryption."""
     
-    def __init__(self, master_password, salt):
+    def __init__(self, master_password, salt, kdf_params=None):
         """
         Initialize the encryption manager with a master password.
         
         Args:
             master_password (str): The master password to derive the encryption key from
             salt (bytes): Salt for key derivation (should be stored in database)
+            kdf_params (dict): KDF parameters, defaults to DEFAULT_KDF_PARAMS
         """
-        self.master_password = master_password
         self.salt = salt
-        self.key = self._derive_key(master_password, salt)
+        self.key = self.derive_key(master_password, salt, kdf_params)
         self.fernet = Fernet(self.key)
     
+    @classmethod
+    def from_key(cls, key):
+        """
+        Build a manager around an existing data key (no key derivation).
+        
+        Args:
+            key (bytes): Fernet key, e.g. an unwrapped data-encryption key
+            
+        Returns:
+            EncryptionManager: Manager that encrypts with that key
+        """
+        manager = cls.__new__(cls)
+        manager.salt = None
+        manager.key = key
+        manager.fernet = Fernet(key)
+        return manager
+    
     @staticmethod
     def generate_salt():
         """Generate a random salt for key derivation."""
         return os.urandom(16)
     
-    def _derive_key(self, password, salt):
+    @staticmethod
+    def generate_data_key():
+        """Generate a random 32-byte data-encryption key (Fernet format)."""
+        return Fernet.generate_key()
+    
+    @staticmethod
+    def wrap_key(kek, key):
         """
-        Derive a Fernet-compatible key from the master password using PBKDF2.
+        Encrypt a data key with a key-encryption key (derived from the password).
+        
+        Returns:
+            str: Token to store in settings
+        """
+        return Fernet(kek).encrypt(key).decode()
+    
+    @staticmethod
+    def unwrap_key(kek, token):
+        """
+        Recover a data key wrapped by wrap_key.
+        
+        Raises:
+            cryptography.fernet.InvalidToken: If kek is not the key that wrapped it
+        """
+        return Fernet(kek).decrypt(token.encode())
+    
+    @staticmethod
+    def derive_key(password, salt, kdf_params=None):
+        """
+        Derive a Fernet-compatible key from the master password.
         
         Args:
             password (str): Master password
             salt (bytes): Salt for key derivation
+            kdf_params (dict): {"algorithm": "pbkdf2-sha256", "iterations": n} or
+                {"algorithm": "scrypt", "n": n, "r": r, "p": p}; defaults to DEFAULT_KDF_PARAMS
             
         Returns:
             bytes: Base64-encoded 32-byte key suitable for Fernet
         """
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,
-            salt=salt,
-            iterations=100000,
-        )
+        params = kdf_params or DEFAULT_KDF_PARAMS
+        algorithm = params["algorithm"]
+        if algorithm == "pbkdf2-sha256":
+            kdf = PBKDF2HMAC(
+                algorithm=hashes.SHA256(),
+                length=32,
+                salt=salt,
+                iterations=params["iterations"],
+            )
+        elif algorithm == "scrypt":
+            kdf = Scrypt(salt=salt, length=32, n=params["n"], r=params["r"], p=params["p"])
+        else:
+            raise ValueError(f"Unknown KDF algorithm: {algorithm}")
         key = base64.urlsafe_b64encode(kdf.derive(password.encode()))
         return key
     
+    @staticmethod
+    def benchmark_kdf(iterations=KDF_BENCHMARK_ITERATIONS, rounds=3):
+        """
+        Measure PBKDF2-SHA256 throughput on this machine.
+        
+        Args:
+            iterations (int): Iterations per measured derivation
+            rounds (int): Measurements taken; the fastest one is used
+            
+        Returns:
+            float: Iterations per second
+        """
+        salt = os.urandom(16)
+        best = None
+        for _ in range(rounds):
+            start = time.perf_counter()
+            PBKDF2HMAC(algorithm=hashes.SHA256(), length=32, salt=salt, iterations=iterations).derive(b"benchmark")
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return iterations / max(best, 1e-6)
+    
+    @staticmethod
+    def kdf_params_for_rate(rate, target_ms=KDF_TARGET_MS):
+        """
+        PBKDF2 parameters that take about target_ms at the given throughput.
+        
+        Args:
+            rate (float): Iterations per second (see benchmark_kdf)
+            target_ms (int): Desired derivation time in milliseconds
+            
+        Returns:
+            dict: KDF parameters for derive_key
+        """
+        iterations = int(rate * target_ms / 1000 / 10000) * 10000
+        iterations = min(max(iterations, KDF_MIN_ITERATIONS), KDF_MAX_ITERATIONS)
+        return {"algorithm": "pbkdf2-sha256", "iterations": iterations}
+    
+    @staticmethod
+    def calibrate_kdf(target_ms=KDF_TARGET_MS):
+        """Benchmark this machine and return KDF parameters that hit target_ms."""
+        return EncryptionManager.kdf_params_for_rate(EncryptionManager.benchmark_kdf(), target_ms)
+    
     def encrypt(self, plaintext):
         """
         Encrypt a plaintext string.
@@ -108,6 +221,45 @@ class EncryptionManager:
         
         return tuple(encrypted_data)
     
+    def seal_credential(self, fields):
+        """
+        Serialize all credential fields into one compact blob and seal it with a single token.
+        
+        Args:
+            fields (tuple/list): The 11 credential fields (detalle ... ip_pub)
+            
+        Returns:
+            str: One Fernet token holding every field
+        """
+        payload = json.dumps([None if f is None else str(f) for f in fields],
+                             ensure_ascii=False, separators=(",", ":"))
+        return self.fernet.encrypt(payload.encode()).decode()
+    
+    def unseal_credential(self, token):
+        """
+        Open a token produced by seal_credential.
+        
+        Returns:
+            tuple: The 11 credential fields
+        """
+        return tuple(json.loads(self.fernet.decrypt(token.encode())))
+    
+    def decrypt_record(self, row):
+        """
+        Decrypt a row as read by DatabaseManager:
+        (id, detalle ... ip_pub, row_color, sealed).
+        
+        Sealed rows are opened with one operation; per-field rows are decrypted
+        field by field. The trailing sealed column is dropped from the result.
+        """
+        if len(row) <= 13:
+            return self.decrypt_credential(row)
+        sealed = row[13]
+        if sealed:
+            return (row[0], *self.unseal_credential(sealed), row[12])
+        decrypt = self._decrypt_field
+        return (row[0], *[decrypt(value) for value in row[1:12]], row[12])
+    
     def decrypt_credential(self, data):
         """
         Decrypt all fields in a credential tuple/list.
@@ -120,12 +272,106 @@ class EncryptionManager:
         Returns:
             tuple: Decrypted credential data
         """
-        # Convert to list for easier manipulation
-        decrypted_data = list(data)
-        
+        decrypt = self._decrypt_field
         # Skip id (index 0), decrypt all other fields
-        for i in range(1, len(decrypted_data)):
-            if decrypted_data[i] is not None:
-                decrypted_data[i] = self.decrypt(str(decrypted_data[i]))
+        return (data[0], *[decrypt(value) for value in data[1:]])
+    
+    def _decrypt_field(self, value):
+        """Decrypt one stored field; same fallback rules as decrypt() without the extra copies."""
+        if value is None or value == "":
+            return value
+        if not isinstance(value, str):
+            value = str(value)
+        try:
+            return self.fernet.decrypt(value.encode()).decode()
+        except Exception:
+            # Might be unencrypted data
+            return value
+    
+    def lazy_rows(self, rows):
+        """Wrap rows as read by DatabaseManager in LazyRecord (nothing is decrypted yet)."""
+        return [LazyRecord(self, row) for row in rows]
+    
+    def decrypt_rows(self, rows):
+        """
+        Decrypt a batch of credential rows (same layout as decrypt_record).
         
-        return tuple(decrypted_data)
+        Args:
+            rows (list): Encrypted rows from the database
+            
+        Returns:
+            list: Decrypted rows in the original order
+        """
+        return [self.decrypt_record(row) for row in rows]
+
+
+class LazyRecord:
+    """
+    Read-only credential row (id, detalle ... ip_pub, row_color) that keeps the
+    ciphertext and decrypts a field on first access.
+    
+    Behaves like the tuples returned by decrypt_record (indexing, slicing,
+    len, iteration). Fields never read (masked columns, rows not shown) are
+    never decrypted. Sealed rows are opened as a whole on first access, since
+    all their fields share one token.
+    """
+    
+    __slots__ = ("_manager", "_raw", "_values")
+    
+    def __init__(self, manager, raw):
+        """
+        Args:
+            manager: EncryptionManager used to decrypt
+            raw (tuple): (id, 11 stored fields, row_color, sealed)
+        """
+        self._manager = manager
+        self._raw = raw
+        self._values = {}
+    
+    def __len__(self):
+        return RECORD_LENGTH
+    
+    def __iter__(self):
+        return (self[i] for i in range(RECORD_LENGTH))
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return tuple(self[i] for i in range(*index.indices(RECORD_LENGTH)))
+        if index < 0:
+            index += RECORD_LENGTH
+        if not 0 <= index < RECORD_LENGTH:
+            raise IndexError("record index out of range")
+        if index == 0 or index == RECORD_LENGTH - 1:
+            return self._raw[index]   # id and row_color are not encrypted
+        
+        values = self._values
+        if index in values:
+            return values[index]
+        sealed = self._raw[13]
+        if sealed:
+            fields = self._manager.unseal_credential(sealed)
+            values.update((i + 1, value) for i, value in enumerate(fields) if i + 1 not in UNCACHED_FIELDS)
+            value = fields[index - 1]
+        else:
+            value = self._manager._decrypt_field(self._raw[index])
+            if index not in UNCACHED_FIELDS:
+                values[index] = value
+        return value
+    
+    def __repr__(self):
+        return f"LazyRecord(id={self._raw[0]})"
+    
+    def is_blank(self, index):
+        """True if a field is empty; for per-field rows this needs no decryption."""
+        if 0 < index < RECORD_LENGTH - 1 and not self._raw[13]:
+            value = self._raw[index]
+        else:
+            value = self[index]
+        return value is None or value == ""
+    
+    def with_color(self, row_color):
+        """Copy of this record with another row_color (keeps what is already decrypted)."""
+        raw = self._raw
+        record = LazyRecord(self._manager, (*raw[:12], row_color, *raw[13:]))
+        record._values.update(self._values)
+        return record
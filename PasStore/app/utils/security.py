@@ -1,28 +1,66 @@
 import hashlib
 import base64
-from app.utils.encryption import EncryptionManager
+import json
+import time
+from cryptography.fernet import Fernet, InvalidToken
+from app.config import (ENCRYPTION_SALT_SETTING, KDF_PARAMS_SETTING, KEY_CHECK_SETTING, MASTER_HASH_SETTING,
+                        MASTER_PASSWORD_SETTINGS, WRAPPED_KEY_SETTING)
+from app.utils.encryption import EncryptionManager, DEFAULT_KDF_PARAMS, KDF_TARGET_MS
+
+# WRAPPED_KEY_SETTING: data key (DEK) wrapped with the key derived from the master password
+# KEY_CHECK_SETTING: token that authenticates the derived key in vaults without a wrapped data key
+KEY_CHECK_PLAINTEXT = b"PasStore key check"
+# Unlock time (ms) the KDF is calibrated for; overridable per machine in settings
+KDF_TARGET_SETTING = "kdf_target_ms"
+# The KDF is re-tuned at login when it took this many times more/less than the target
+KDF_RETUNE_FACTOR = 2
 
 class SecurityManager:
     @staticmethod
     def get_master_hash(db):
-        return db.get_setting("master_hash")
+        return db.get_setting(MASTER_HASH_SETTING)
 
     @staticmethod
     def set_master_password(db, password):
-        hashed = hashlib.sha256(password.encode()).hexdigest()
-        db.set_setting("master_hash", hashed)
-        return hashed
+        """
+        Set up a new vault: fresh salt, KDF parameters and a random data key
+        wrapped with the key derived from the password.
+        
+        Args:
+            db: DatabaseManager instance
+            password (str): Master password
+        
+        Returns:
+            EncryptionManager: Manager for the new data key
+        """
+        salt = EncryptionManager.generate_salt()
+        kdf_params = EncryptionManager.calibrate_kdf(SecurityManager.get_kdf_target_ms(db))
+        kek = EncryptionManager.derive_key(password, salt, kdf_params)
+        data_key = EncryptionManager.generate_data_key()
+        db.set_settings({
+            ENCRYPTION_SALT_SETTING: base64.b64encode(salt).decode(),
+            KDF_PARAMS_SETTING: json.dumps(kdf_params),
+            WRAPPED_KEY_SETTING: EncryptionManager.wrap_key(kek, data_key),
+            KEY_CHECK_SETTING: None,
+            MASTER_HASH_SETTING: None,
+        })
+        return EncryptionManager.from_key(data_key)
 
     @staticmethod
     def has_master_password(db):
-        return db.get_setting("master_hash") is not None
+        return any(db.get_setting(key) is not None for key in MASTER_PASSWORD_SETTINGS)
+
+    @staticmethod
+    def hash_password(password):
+        return hashlib.sha256(password.encode()).hexdigest()
 
     @staticmethod
     def verify_password(password, stored_hash):
+        """Legacy check against the unsalted SHA-256 hash (vaults before key_check)."""
         if not stored_hash:
             return False
-        return hashlib.sha256(password.encode()).hexdigest() == stored_hash
-    
+        return SecurityManager.hash_password(password) == stored_hash
+
     @staticmethod
     def get_encryption_salt(db):
         """
@@ -30,19 +68,134 @@ class SecurityManager:
         
         Args:
             db: DatabaseManager instance
-            
+        
         Returns:
             bytes: Salt for encryption key derivation
         """
-        salt_b64 = db.get_setting("encryption_salt")
+        salt_b64 = db.get_setting(ENCRYPTION_SALT_SETTING)
         if salt_b64:
             return base64.b64decode(salt_b64)
         else:
             # Generate new salt
             salt = EncryptionManager.generate_salt()
-            db.set_setting("encryption_salt", base64.b64encode(salt).decode())
+            db.set_setting(ENCRYPTION_SALT_SETTING, base64.b64encode(salt).decode())
             return salt
-    
+
+    @staticmethod
+    def get_kdf_params(db):
+        """KDF parameters stored in settings (DEFAULT_KDF_PARAMS for older vaults)."""
+        params = db.get_setting(KDF_PARAMS_SETTING)
+        return json.loads(params) if params else dict(DEFAULT_KDF_PARAMS)
+
+    @staticmethod
+    def get_kdf_target_ms(db):
+        return int(db.get_setting(KDF_TARGET_SETTING, KDF_TARGET_MS))
+
+    @staticmethod
+    def unlock(password, db):
+        """
+        Verify the master password and build the EncryptionManager.
+        
+        Runs the KDF once; the derived key is checked by authenticating a
+        stored token (the wrapped data key, or key_check in legacy vaults)
+        and then reused, so there is no separate password hash. Slow by
+        design: call it off the UI thread. When the derivation was far off the
+        target unlock time, the data key is re-wrapped with recalibrated
+        parameters (one more derivation, only on that login). Legacy vaults
+        are upgraded to a wrapped data key on their first unlock, without
+        re-encrypting any record.
+        
+        Args:
+            password (str): Master password
+            db: DatabaseManager instance
+        
+        Returns:
+            EncryptionManager: Configured manager, or None if the password is wrong
+        """
+        salt = SecurityManager.get_encryption_salt(db)
+        kdf_params = SecurityManager.get_kdf_params(db)
+        start = time.perf_counter()
+        kek = EncryptionManager.derive_key(password, salt, kdf_params)
+        elapsed = time.perf_counter() - start
+
+        wrapped = db.get_setting(WRAPPED_KEY_SETTING)
+        if wrapped:
+            try:
+                data_key = EncryptionManager.unwrap_key(kek, wrapped)
+            except InvalidToken:
+                return None
+            SecurityManager._retune_kdf(db, password, salt, kdf_params, elapsed, data_key)
+            return EncryptionManager.from_key(data_key)
+
+        if not SecurityManager._check_key(db, kek, password):
+            return None
+
+        if SecurityManager.has_legacy_key(db):
+            # Records are encrypted with the password-derived key itself
+            SecurityManager._upgrade_legacy_key(db, password, kek)
+            return EncryptionManager.from_key(kek)
+
+        # Vault without encrypted data yet: start directly with a data key
+        data_key = EncryptionManager.generate_data_key()
+        db.set_settings({
+            WRAPPED_KEY_SETTING: EncryptionManager.wrap_key(kek, data_key),
+            KEY_CHECK_SETTING: None,
+            MASTER_HASH_SETTING: None,
+        })
+        return EncryptionManager.from_key(data_key)
+
+    @staticmethod
+    def _upgrade_legacy_key(db, password, legacy_key):
+        """
+        Turn a legacy vault into a wrapped-key one in O(1): the key its records
+        are encrypted with becomes the data key, wrapped under a new salt and
+        freshly calibrated KDF parameters. A new salt is needed so the new
+        key-encryption key differs from the data key it wraps.
+        """
+        salt = EncryptionManager.generate_salt()
+        kdf_params = EncryptionManager.calibrate_kdf(SecurityManager.get_kdf_target_ms(db))
+        kek = EncryptionManager.derive_key(password, salt, kdf_params)
+        db.set_settings({
+            ENCRYPTION_SALT_SETTING: base64.b64encode(salt).decode(),
+            KDF_PARAMS_SETTING: json.dumps(kdf_params),
+            WRAPPED_KEY_SETTING: EncryptionManager.wrap_key(kek, legacy_key),
+            KEY_CHECK_SETTING: None,
+            MASTER_HASH_SETTING: None,
+        })
+
+    @staticmethod
+    def _retune_kdf(db, password, salt, kdf_params, elapsed, data_key):
+        """
+        Re-wrap the data key with new PBKDF2 parameters when the derivation
+        that just ran (elapsed seconds) was far off the target unlock time,
+        e.g. a vault created on a faster or slower machine.
+        """
+        if kdf_params.get("algorithm") != "pbkdf2-sha256":
+            return
+        target_ms = SecurityManager.get_kdf_target_ms(db)
+        if target_ms / KDF_RETUNE_FACTOR <= elapsed * 1000 <= target_ms * KDF_RETUNE_FACTOR:
+            return
+        new_params = EncryptionManager.kdf_params_for_rate(kdf_params["iterations"] / max(elapsed, 1e-6), target_ms)
+        if new_params == kdf_params:
+            return
+        kek = EncryptionManager.derive_key(password, salt, new_params)
+        db.set_settings({
+            KDF_PARAMS_SETTING: json.dumps(new_params),
+            WRAPPED_KEY_SETTING: EncryptionManager.wrap_key(kek, data_key),
+        })
+
+    @staticmethod
+    def _check_key(db, kek, password):
+        """Authenticate kek with key_check, or with the unsalted master_hash in the oldest vaults."""
+        token = db.get_setting(KEY_CHECK_SETTING)
+        if token:
+            try:
+                return Fernet(kek).decrypt(token.encode()) == KEY_CHECK_PLAINTEXT
+            except InvalidToken:
+                return False
+        # The caller replaces both by a wrapped data key
+        return SecurityManager.verify_password(password, SecurityManager.get_master_hash(db))
+
     @staticmethod
     def create_encryption_manager(password, db):
         """
@@ -51,9 +204,51 @@ class SecurityManager:
         Args:
             password (str): Master password
             db: DatabaseManager instance
-            
+        
         Returns:
             EncryptionManager: Configured encryption manager
+        
+        Raises:
+            ValueError: If the password is wrong
         """
-        salt = SecurityManager.get_encryption_salt(db)
-        return EncryptionManager(password, salt)
+        manager = SecurityManager.unlock(password, db)
+        if manager is None:
+            raise ValueError("Incorrect master password")
+        return manager
+
+    @staticmethod
+    def has_legacy_key(db):
+        """True if the records are encrypted directly with the password-derived key."""
+        if db.get_setting(WRAPPED_KEY_SETTING):
+            return False
+        # A started (maybe interrupted) migration already wrote rows with that key
+        return db.is_data_encrypted() or db.get_setting("migration_end_id") is not None
+
+    @staticmethod
+    def change_master_password(db, encryption_manager, new_password):
+        """
+        Change the master password.
+        
+        Only the data key is re-wrapped with the key derived from the new
+        password, so the cost does not depend on the vault size (legacy vaults
+        already got a wrapped data key when they were unlocked).
+        
+        Args:
+            db: DatabaseManager instance
+            encryption_manager: EncryptionManager unlocked with the current password
+            new_password (str): New master password
+        
+        Returns:
+            EncryptionManager: encryption_manager, whose data key is unchanged
+        """
+        salt = EncryptionManager.generate_salt()
+        kdf_params = EncryptionManager.calibrate_kdf(SecurityManager.get_kdf_target_ms(db))
+        kek = EncryptionManager.derive_key(new_password, salt, kdf_params)
+        db.set_settings({
+            ENCRYPTION_SALT_SETTING: base64.b64encode(salt).decode(),
+            KDF_PARAMS_SETTING: json.dumps(kdf_params),
+            WRAPPED_KEY_SETTING: EncryptionManager.wrap_key(kek, encryption_manager.key),
+            KEY_CHECK_SETTING: None,
+            MASTER_HASH_SETTING: None,
+        })
+        return encryption_manager
@@ -0,0 +1,86 @@
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+# Cada cuánto revisa el loop de Tk si hay resultados (ms)
+POLL_INTERVAL_MS = 30
+
+
+class TaskRunner:
+    """
+    Runs database and crypto work off the Tk main loop.
+    
+    Tasks execute on a single background thread, so they run one at a time and
+    in submission order. Completion and progress callbacks are queued and
+    executed on the Tk thread by polling with root.after, so callbacks can touch
+    widgets freely.
+    """
+    
+    def __init__(self, root, max_workers=1):
+        self.root = root
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="passtore-worker")
+        self._events = queue.Queue()
+        self._pending = 0
+        self._poll_job = None
+    
+    def submit(self, fn, *args, on_done=None, on_error=None, on_progress=None, **kwargs):
+        """
+        Run fn(*args, **kwargs) in the background.
+        
+        Args:
+            on_done: callable(result) run on the Tk thread when fn returns
+            on_error: callable(exception) run on the Tk thread if fn raises;
+                defaults to Tk's report_callback_exception
+            on_progress: callable(*args) run on the Tk thread; when given, fn
+                receives a thread-safe ``progress`` keyword argument to call
+                
+        Returns:
+            concurrent.futures.Future
+        """
+        if on_progress is not None:
+            kwargs["progress"] = lambda *p: self._events.put((on_progress, p))
+        
+        self._pending += 1
+        future = self._executor.submit(fn, *args, **kwargs)
+        future.add_done_callback(lambda f: self._events.put((self._finish, (f, on_done, on_error))))
+        self._schedule_poll()
+        return future
+    
+    @property
+    def busy(self):
+        return self._pending > 0
+    
+    def shutdown(self):
+        """Wait for the running task and stop the worker thread."""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+    
+    def _finish(self, future, on_done, on_error):
+        self._pending -= 1
+        if future.cancelled():
+            return
+        exc = future.exception()
+        if exc is not None:
+            if on_error is not None:
+                on_error(exc)
+            else:
+                self.root.report_callback_exception(type(exc), exc, exc.__traceback__)
+        elif on_done is not None:
+            on_done(future.result())
+    
+    def _schedule_poll(self):
+        if self._poll_job is None:
+            self._poll_job = self.root.after(POLL_INTERVAL_MS, self._poll)
+    
+    def _poll(self):
+        self._poll_job = None
+        while True:
+            try:
+                callback, args = self._events.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                callback(*args)
+            except Exception as exc:
+                # Keep polling: one failing callback must not strand the rest
+                self.root.report_callback_exception(type(exc), exc, exc.__traceback__)
+        if self._pending:
+            self._schedule_poll()
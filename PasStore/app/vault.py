@@ -0,0 +1,162 @@
+from app.config import DB_NAME, FIELD_NAMES
+from app.data import csv_io
+from app.data.database import DatabaseManager
+from app.data.search import INDEXED_FIELDS
+from app.utils.security import SecurityManager
+
+# API sin interfaz gráfica sobre la bóveda (usada por cli.py); no importa tkinter
+
+PASSWORD_FIELD = FIELD_NAMES.index("password") + 1
+
+
+class Vault:
+    """
+    Unlocked vault: DatabaseManager plus the EncryptionManager of its data key.
+
+    Records are returned as plain dicts (id, tab_id, the FIELD_NAMES fields and
+    row_color), ready to be serialized as JSON.
+    """
+
+    def __init__(self, db, encryption_manager):
+        self.db = db
+        self.encryption_manager = encryption_manager
+
+    @classmethod
+    def open(cls, password, db_name=DB_NAME):
+        """
+        Open and unlock a vault (runs the KDF once).
+
+        A vault still in the old plaintext format is encrypted first, as the
+        GUI does at startup: rows written here are encrypted, and the GUI's
+        migration would otherwise encrypt them a second time.
+
+        Raises:
+            ValueError: If the vault has no master password or the password is wrong
+        """
+        db = DatabaseManager(db_name)
+        db.init_db()
+        if not SecurityManager.has_master_password(db):
+            db.close()
+            raise ValueError("The vault has no master password; set it up from the GUI first")
+        try:
+            manager = SecurityManager.create_encryption_manager(password, db)
+            if not db.is_data_encrypted():
+                db.migrate_to_encrypted(manager)
+        except ValueError:
+            db.close()
+            raise
+        return cls(db, manager)
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def tabs(self):
+        """Tabs in display order, with their number of credentials."""
+        return [{"id": tab_id, "name": name, "color": color, "count": self.db.count_credentials(tab_id)}
+                for tab_id, name, color in self.db.get_tabs()]
+
+    def resolve_tab(self, tab):
+        """Tab id for a tab name or id (as int or numeric string), or None."""
+        for tab_id, name, _ in self.db.get_tabs():
+            if name == tab or str(tab_id) == str(tab):
+                return tab_id
+        return None
+
+    def list(self, tab, reveal=False):
+        tab_id = self._require_tab(tab)
+        return [record_to_dict(tab_id, row, reveal)
+                for chunk in self.db.iter_credentials(tab_id, self.encryption_manager) for row in chunk]
+
+    def get(self, record_id, reveal=True):
+        """One credential by id, or None."""
+        tab_id = self.db.get_credential_tab(record_id)
+        if tab_id is None:
+            return None
+        row = self.db.get_credential(record_id, tab_id, self.encryption_manager)
+        return record_to_dict(tab_id, row, reveal) if row is not None else None
+
+    def add(self, tab, fields):
+        """
+        Add a credential at the end of a tab (created if it does not exist).
+
+        Args:
+            tab: Tab name or id
+            fields (dict): Values by FIELD_NAMES name; missing ones are stored empty
+
+        Returns:
+            int: New record id
+        """
+        unknown = set(fields) - set(FIELD_NAMES)
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+        tab_id = self.resolve_tab(tab)
+        if tab_id is None:
+            self.db.add_tab(str(tab), "#E0E0E0")
+            tab_id = self.resolve_tab(tab)
+        data = tuple(fields.get(name, "") for name in FIELD_NAMES)
+        return self.db.add_credential((*data, tab_id), self.encryption_manager)
+
+    def import_csv(self, filename, default_tab_name="Principal"):
+        """Bulk import a CSV in the export format. Returns the number of rows."""
+        count, _ = csv_io.import_csv(self.db, filename, self.encryption_manager, default_tab_name)
+        return count
+
+    def export_csv(self, filename):
+        return csv_io.export_csv(self.db, filename, self.encryption_manager)
+
+    def set_storage_format(self, storage_format):
+        """
+        Select how credentials are stored ("fields" or "sealed").
+
+        Switching to "sealed" converts the existing rows right away; with
+        "fields" only new and updated rows use one token per field.
+
+        Returns:
+            int: Number of converted rows
+        """
+        self.db.set_storage_format(storage_format)
+        converted, _ = self.db.migrate_to_sealed(self.encryption_manager)
+        return converted
+
+    def search(self, query, limit=100, reveal=False):
+        """
+        Credentials whose indexed fields contain the query (case-insensitive).
+
+        A single streaming pass over the vault, so one-off lookups do not pay
+        for building the GUI's trigram index.
+        """
+        query = query.strip().lower()
+        if not query:
+            return []
+        hits = []
+        for tab_id, _, _ in self.db.get_tabs():
+            for chunk in self.db.iter_credentials(tab_id, self.encryption_manager):
+                for row in chunk:
+                    if any(row[i] and query in str(row[i]).lower() for i in INDEXED_FIELDS):
+                        hits.append(record_to_dict(tab_id, row, reveal))
+                        if len(hits) >= limit:
+                            return hits
+        return hits
+
+    def _require_tab(self, tab):
+        tab_id = self.resolve_tab(tab)
+        if tab_id is None:
+            raise ValueError(f"Tab not found: {tab}")
+        return tab_id
+
+
+def record_to_dict(tab_id, row, reveal=False):
+    """Decrypted row (id, 11 fields, row_color) as a dict; the password only if reveal."""
+    record = {"id": row[0], "tab_id": tab_id}
+    for index, name in enumerate(FIELD_NAMES, start=1):
+        if index == PASSWORD_FIELD and not reveal:
+            continue
+        record[name] = row[index]
+    record["row_color"] = row[len(FIELD_NAMES) + 1]
+    return record
@@ -0,0 +1,358 @@
+import argparse
+import ast
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from app.data.csv_io import export_csv, import_csv
+from app.data.database import DatabaseManager
+from app.utils.security import SecurityManager
+
+# Benchmark reproducible de operaciones sobre la bóveda (resultados en JSON)
+#   python benchmark.py                       -> 1k, 10k y 100k credenciales
+#   python benchmark.py --sizes 1000 --output bench-1.2.3.json
+#   python benchmark.py --sizes                -> solo el chequeo de arranque
+#
+# El arranque se mide con "python -X importtime" y falla (exit 1) si supera el
+# presupuesto o si importa módulos que deben cargarse después del login.
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+DEFAULT_TABS = 5
+PASSWORD = "benchmark-password"
+SEED = 1234
+
+# Presupuesto de imports al arrancar (ms, mediana) por punto de entrada
+STARTUP_BUDGET_MS = {"main": 60, "cli": 60}
+# Módulos que no deben importarse antes de mostrar el login / en el CLI
+STARTUP_FORBIDDEN = {
+    "main": ("cryptography", "app.utils.security", "app.ui.main_window", "csv", "concurrent.futures", "tkinter.filedialog"),
+    "cli": ("tkinter", "cryptography", "sqlite3"),
+}
+
+
+def read_version():
+    """__version__ from main.py, without importing the UI."""
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+    with open(path, encoding="utf-8") as file:
+        for node in ast.parse(file.read()).body:
+            if isinstance(node, ast.Assign) and any(getattr(t, "id", None) == "__version__" for t in node.targets):
+                return ast.literal_eval(node.value)
+    return None
+
+
+def synthetic_records(count, tabs, seed=SEED):
+    """Deterministic (tab_name, 11 fields) records spread over `tabs` tabs."""
+    rng = random.Random(seed)
+    kinds = ["SSH", "RDP", "Web", "DB", "VPN"]
+    roles = ["admin", "read", "dba", "deploy", ""]
+    for i in range(count):
+        host = f"srv-{rng.randrange(10000):04d}.example.local"
+        # The first tab is the default one created by init_db
+        tab_name = "Principal" if i % tabs == 0 else f"Tab {i % tabs + 1}"
+        yield (tab_name, (
+            f"Sistema {i}",
+            rng.choice(kinds),
+            host,
+            str(rng.choice([22, 443, 1521, 3389, 5432])),
+            f"user{rng.randrange(1000)}",
+            "".join(rng.choice("abcdefghijkmnpqrstuvwxyz23456789") for _ in range(16)),
+            rng.choice(roles),
+            f"Contiene {rng.randrange(100)}" if rng.random() < 0.5 else "",
+            rng.choice(["PROD", "TEST", "DEV"]),
+            f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(256)}",
+            f"200.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(256)}" if rng.random() < 0.3 else "",
+        ))
+
+
+def generate_vault(path, count, tabs, encrypted=True):
+    """
+    Create a vault with `count` synthetic credentials.
+
+    Returns:
+        tuple: (DatabaseManager, EncryptionManager or None)
+    """
+    db = DatabaseManager(path)
+    db.init_db()
+    encryption_manager = SecurityManager.set_master_password(db, PASSWORD)
+    if not encrypted:
+        db.bulk_add_credentials(synthetic_records(count, tabs))
+        return db, encryption_manager
+    db.bulk_add_credentials(synthetic_records(count, tabs), encryption_manager)
+    db.mark_data_encrypted()
+    return db, encryption_manager
+
+
+def timed(fn, *args, repeat=1, **kwargs):
+    """Run fn `repeat` times; returns (result of the last run, median seconds)."""
+    times = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        times.append(time.perf_counter() - start)
+    return result, statistics.median(times)
+
+
+# --- Sustituto de Tk para medir load_data sin pantalla ---
+class HeadlessTree:
+    """Minimal ttk.Treeview stand-in: keeps items and their order in memory."""
+
+    def __init__(self, columns):
+        self._columns = columns
+        self._items = {}
+        self._order = []
+
+    def __getitem__(self, key):
+        return self._columns
+
+    def insert(self, parent, index, iid=None, values=(), tags=()):
+        self._items[iid] = {"values": list(values), "tags": tags}
+        self._order.append(iid)
+        return iid
+
+    def delete(self, *item_ids):
+        if len(item_ids) == len(self._order):
+            self._items.clear()
+            self._order.clear()
+            return
+        for item_id in item_ids:
+            self._order.remove(item_id)
+            del self._items[item_id]
+
+    def get_children(self, item=""):
+        return tuple(self._order)
+
+    def heading(self, col, option=None, **kwargs):
+        return col
+
+    def column(self, col, **kwargs):
+        pass
+
+    def tag_configure(self, *args, **kwargs):
+        pass
+
+
+class HeadlessRoot:
+    def after(self, ms, fn, *args):
+        return None
+
+    def after_idle(self, fn, *args):
+        return None
+
+
+class HeadlessFont:
+    """font.measure stand-in: fixed width per character."""
+
+    def measure(self, text):
+        return 7 * len(text)
+
+
+class InlineTasks:
+    """TaskRunner stand-in that runs each task synchronously."""
+
+    def submit(self, fn, *args, on_done=None, on_error=None, on_progress=None, **kwargs):
+        if on_progress is not None:
+            kwargs["progress"] = on_progress
+        result = fn(*args, **kwargs)
+        if on_done is not None:
+            on_done(result)
+
+
+def headless_app(db, encryption_manager, tab_id):
+    """A MainApp with the Tk pieces replaced, enough for load_data and paging."""
+    from app.data.search import SearchIndex
+    from app.ui import main_window
+    from app.ui.column_widths import ColumnWidthCache
+
+    app = main_window.MainApp.__new__(main_window.MainApp)
+    app.db = db
+    app.encryption_manager = encryption_manager
+    app.current_tab_id = tab_id
+    app.root = HeadlessRoot()
+    app.tree = HeadlessTree(main_window.COLUMNS)
+    app.tasks = InlineTasks()
+    app.col_visible = {col: True for col in main_window.COLUMNS}
+    app.configured_color_tags = set()
+    app.width_cache = ColumnWidthCache(main_window.COLUMNS)
+    app.width_cache._font = HeadlessFont()
+    app.tab_rows = []
+    app.tree_loaded_count = 0
+    app._page_job = None
+    app._select_job = None
+    app._load_generation = 0
+    app.search_index = SearchIndex()
+    app._indexing = False
+    app._index_backlog = []
+    return app
+
+
+def import_times(module):
+    """
+    Import `module` in a fresh interpreter with -X importtime.
+
+    Returns:
+        tuple: (cumulative ms of the module, {imported module: cumulative ms})
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=os.path.dirname(os.path.abspath(__file__)),
+                            capture_output=True, text=True, check=True)
+    modules = {}
+    for line in result.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit():
+            modules[name.strip()] = int(cumulative) / 1000
+    return modules.get(module, 0.0), modules
+
+
+def check_startup(budgets=None, repeat=5):
+    """
+    Median import time of each entry point against its budget, and any
+    forbidden module imported at startup.
+
+    Returns:
+        dict: entry point -> {import_ms, budget_ms, slowest, forbidden, ok}
+    """
+    report = {}
+    for module, budget in (budgets or STARTUP_BUDGET_MS).items():
+        runs = [import_times(module) for _ in range(repeat)]
+        modules = runs[-1][1]
+        forbidden = sorted(name for name in modules
+                           if any(name == bad or name.startswith(bad + ".") for bad in STARTUP_FORBIDDEN.get(module, ())))
+        elapsed = statistics.median(ms for ms, _ in runs)
+        slowest = sorted((name for name in modules if name != module), key=lambda name: -modules[name])[:5]
+        report[module] = {
+            "import_ms": round(elapsed, 3),
+            "budget_ms": budget,
+            "slowest": {name: modules[name] for name in slowest},
+            "forbidden": forbidden,
+            "ok": elapsed <= budget and not forbidden,
+        }
+    return report
+
+
+def bench_size(workdir, count, tabs, repeat):
+    """Run every benchmark on a vault of `count` credentials."""
+    results = {}
+    path = os.path.join(workdir, f"vault-{count}.db")
+
+    # init_db: fresh schema and the fast path on an up-to-date one
+    _, results["init_db_fresh"] = timed(DatabaseManager(os.path.join(workdir, f"empty-{count}.db")).init_db)
+
+    _, results["generate_vault"] = timed(generate_vault, path, count, tabs)
+    db = DatabaseManager(path)
+    _, results["init_db_current"] = timed(db.init_db, repeat=repeat)
+
+    # Unlock (one KDF run, calibrated to the target unlock time)
+    encryption_manager, results["unlock"] = timed(SecurityManager.create_encryption_manager, PASSWORD, db, repeat=repeat)
+
+    # get_credentials per tab: cold (read + decrypt) and warm (cache)
+    tab_ids = [tab[0] for tab in db.get_tabs()]
+    cold = []
+    warm = []
+    for tab_id in tab_ids:
+        db._invalidate_cache()
+        cold.append(timed(db.get_credentials, tab_id, encryption_manager)[1])
+        warm.append(timed(db.get_credentials, tab_id, encryption_manager)[1])
+    results["get_credentials_cold_per_tab"] = statistics.median(cold)
+    results["get_credentials_warm_per_tab"] = statistics.median(warm)
+
+    # Reading every field (what export and the search index need)
+    def read_all():
+        return sum(1 for tab_id in tab_ids for chunk in db.iter_credentials(tab_id, encryption_manager) for _ in chunk)
+    _, results["decrypt_all"] = timed(read_all)
+
+    # Headless load_data (first page) and scrolling through the whole tab
+    app = headless_app(db, encryption_manager, tab_ids[0])
+    db._invalidate_cache()
+    _, results["load_data_cold"] = timed(app.load_data)
+    _, results["load_data_warm"] = timed(app.load_data, repeat=repeat)
+
+    def scroll_to_end():
+        while app.insert_next_page():
+            pass
+        app.auto_resize_columns()
+    _, results["load_data_scroll_all"] = timed(scroll_to_end)
+
+    # Reordering: bottom row to the top, one step up, and a tab move
+    rows = db.get_credentials(tab_ids[0], encryption_manager)
+    _, results["move_bottom_to_top"] = timed(db.move_entries, [rows[-1][0]], tab_ids[0], 0)
+    _, results["move_entry_up"] = timed(db.move_entry_up, rows[-1][0], tab_ids[0])
+    _, results["move_selection_to_other_tab"] = timed(db.move_entries, [row[0] for row in rows[:100]], tab_ids[-1], 0)
+    _, results["move_tab"] = timed(db.move_tab, tab_ids[-1], 0)
+
+    # CSV export and import
+    csv_path = os.path.join(workdir, f"export-{count}.csv")
+    _, results["export_csv"] = timed(export_csv, db, csv_path, encryption_manager)
+    import_db, import_manager = generate_vault(os.path.join(workdir, f"import-{count}.db"), 0, 1)
+    _, results["import_csv"] = timed(import_csv, import_db, csv_path, import_manager)
+    import_db.close()
+    db.close()
+
+    # Migration of a plaintext vault to the encrypted format
+    plain_db, plain_manager = generate_vault(os.path.join(workdir, f"plain-{count}.db"), count, tabs, encrypted=False)
+    _, results["migrate_to_encrypted"] = timed(plain_db.migrate_to_encrypted, plain_manager)
+    plain_db.close()
+
+    return {name: round(seconds, 6) for name, seconds in results.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de operaciones de la bóveda")
+    parser.add_argument("--sizes", type=int, nargs="*", default=list(DEFAULT_SIZES), help="Cantidades de credenciales")
+    parser.add_argument("--tabs", type=int, default=DEFAULT_TABS, help="Pestañas en la bóveda sintética")
+    parser.add_argument("--repeat", type=int, default=3, help="Repeticiones de las mediciones rápidas (se usa la mediana)")
+    parser.add_argument("--output", help="Archivo JSON de salida (por defecto stdout)")
+    parser.add_argument("--main-budget-ms", type=float, default=STARTUP_BUDGET_MS["main"], help="Presupuesto de imports de main.py")
+    parser.add_argument("--cli-budget-ms", type=float, default=STARTUP_BUDGET_MS["cli"], help="Presupuesto de imports de cli.py")
+    args = parser.parse_args()
+
+    report = {
+        "version": read_version(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "tabs": args.tabs,
+        "unit": "seconds",
+        "startup": check_startup({"main": args.main_budget_ms, "cli": args.cli_budget_ms}),
+        "results": {},
+    }
+
+    workdir = tempfile.mkdtemp(prefix="passtore-bench-")
+    try:
+        for count in args.sizes:
+            print(f"Midiendo {count} credenciales...", file=sys.stderr)
+            report["results"][str(count)] = bench_size(workdir, count, args.tabs, args.repeat)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+    failed = [module for module, startup in report["startup"].items() if not startup["ok"]]
+    for module in failed:
+        startup = report["startup"][module]
+        print(f"Arranque de {module}: {startup['import_ms']} ms (presupuesto {startup['budget_ms']} ms), "
+              f"módulos prohibidos: {', '.join(startup['forbidden']) or 'ninguno'}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,27 @@
+import argparse
+import json
+import os
+import time
+from app.utils.encryption import EncryptionManager, KDF_TARGET_MS
+
+# Mide el KDF en esta máquina y muestra los parámetros que se usarían
+parser = argparse.ArgumentParser(description="Benchmark de derivación de clave (PBKDF2)")
+parser.add_argument("--target-ms", type=int, default=KDF_TARGET_MS, help="Tiempo objetivo de desbloqueo")
+parser.add_argument("--json", action="store_true", help="Salida en JSON")
+args = parser.parse_args()
+
+rate = EncryptionManager.benchmark_kdf()
+params = EncryptionManager.kdf_params_for_rate(rate, args.target_ms)
+
+# Verificar el tiempo real con los parámetros elegidos
+start = time.perf_counter()
+EncryptionManager.derive_key("benchmark", os.urandom(16), params)
+measured_ms = (time.perf_counter() - start) * 1000
+
+if args.json:
+    print(json.dumps({"iterations_per_second": round(rate), "target_ms": args.target_ms,
+                      "kdf_params": params, "measured_ms": round(measured_ms, 1)}))
+else:
+    print(f"PBKDF2-SHA256: {rate:,.0f} iteraciones/s")
+    print(f"Parámetros para {args.target_ms} ms: {params}")
+    print(f"Desbloqueo medido: {measured_ms:.0f} ms")
@@ -0,0 +1,188 @@
+import argparse
+import getpass
+import json
+import os
+import sys
+
+from app import agent
+from app.config import DB_NAME, FIELD_NAMES
+
+# Acceso a la bóveda por línea de comandos, sin Tk (salida JSON)
+#   python cli.py tabs
+#   python cli.py search srv-01
+#   python cli.py get 42 --field password
+#   echo "$PASS" | python cli.py --password-stdin list Principal
+#   python cli.py storage sealed   (formato compacto: convierte las filas existentes)
+#   python cli.py agent &     (desbloquea una vez; tabs/list/get/search usan el agente)
+#
+# La contraseña se pide por consola, o se toma de --password-stdin o de la
+# variable PASSTORE_PASSWORD (nunca como argumento: quedaría en el historial/ps).
+PASSWORD_ENV = "PASSTORE_PASSWORD"
+DB_ENV = "PASSTORE_DB"
+# Comandos de solo lectura que puede responder el agente de desbloqueo
+AGENT_COMMANDS = ("tabs", "list", "get", "search")
+
+
+def read_password(args):
+    if args.password_stdin:
+        return sys.stdin.readline().rstrip("\r\n")
+    password = os.environ.get(PASSWORD_ENV)
+    if password is not None:
+        return password
+    return getpass.getpass("Contraseña maestra: ")
+
+
+def print_json(value):
+    json.dump(value, sys.stdout, ensure_ascii=False, indent=2)
+    sys.stdout.write("\n")
+
+
+def cmd_tabs(vault, args):
+    print_json(vault.tabs())
+
+
+def cmd_list(vault, args):
+    print_json(vault.list(args.tab, reveal=args.show_passwords))
+
+
+def cmd_get(vault, args):
+    record = vault.get(args.id)
+    if record is None:
+        raise ValueError(f"Credential not found: {args.id}")
+    if args.field:
+        # Plain value, handy for piping (e.g. into the clipboard)
+        print(record[args.field] or "")
+    else:
+        print_json(record)
+
+
+def cmd_add(vault, args):
+    fields = {name: getattr(args, name) for name in FIELD_NAMES if getattr(args, name) is not None}
+    print_json({"id": vault.add(args.tab, fields)})
+
+
+def cmd_import(vault, args):
+    print_json({"imported": vault.import_csv(args.file, args.default_tab)})
+
+
+def cmd_export(vault, args):
+    print_json({"exported": vault.export_csv(args.file)})
+
+
+def cmd_search(vault, args):
+    print_json(vault.search(args.query, limit=args.limit, reveal=args.show_passwords))
+
+
+def cmd_storage(vault, args):
+    print_json({"storage_format": args.format, "converted": vault.set_storage_format(args.format)})
+
+
+def cmd_agent(vault, args):
+    if not agent.is_supported():
+        raise ValueError("The unlock agent needs Unix-domain sockets")
+    unlock_agent = agent.UnlockAgent(vault, args.socket, idle_timeout=args.timeout)
+    print(f"{agent.SOCKET_ENV}={unlock_agent.path}; export {agent.SOCKET_ENV}", file=sys.stderr)
+    unlock_agent.serve_forever()
+
+
+def cmd_lock(args):
+    if not agent.is_supported():
+        raise ValueError("The unlock agent needs Unix-domain sockets")
+    agent.AgentClient(args.socket).request("lock")
+    print_json({"locked": True})
+
+
+def open_agent_vault(args):
+    """AgentVault if an agent is serving this vault, else None."""
+    if args.no_agent or args.command not in AGENT_COMMANDS or not agent.is_supported():
+        return None
+    client = agent.AgentClient()
+    try:
+        served = client.request("ping")["db"]
+    except (OSError, ValueError):
+        return None
+    if served != os.path.abspath(args.db):
+        return None
+    return agent.AgentVault(client, args.db)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="PasStore sin interfaz gráfica (salida JSON)")
+    parser.add_argument("--db", default=os.environ.get(DB_ENV, DB_NAME), help="Archivo de la bóveda")
+    parser.add_argument("--password-stdin", action="store_true", help="Leer la contraseña maestra de la primera línea de stdin")
+    parser.add_argument("--no-agent", action="store_true", help="No usar el agente de desbloqueo aunque esté corriendo")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("tabs", help="Listar pestañas").set_defaults(func=cmd_tabs)
+
+    sub = commands.add_parser("list", help="Credenciales de una pestaña")
+    sub.add_argument("tab", help="Nombre o id de la pestaña")
+    sub.add_argument("--show-passwords", action="store_true")
+    sub.set_defaults(func=cmd_list)
+
+    sub = commands.add_parser("get", help="Una credencial por id (incluye la contraseña)")
+    sub.add_argument("id", type=int)
+    sub.add_argument("--field", choices=("id", "tab_id", *FIELD_NAMES, "row_color"), help="Imprimir solo este campo, sin JSON")
+    sub.set_defaults(func=cmd_get)
+
+    sub = commands.add_parser("add", help="Agregar una credencial al final de una pestaña")
+    sub.add_argument("tab", help="Nombre o id de la pestaña (se crea si no existe)")
+    for name in FIELD_NAMES:
+        sub.add_argument(f"--{name.replace('_', '-')}", dest=name)
+    sub.set_defaults(func=cmd_add)
+
+    sub = commands.add_parser("import", help="Importar un CSV (formato de exportación)")
+    sub.add_argument("file")
+    sub.add_argument("--default-tab", default="Principal", help="Pestaña para filas sin columna de pestaña")
+    sub.set_defaults(func=cmd_import)
+
+    sub = commands.add_parser("export", help="Exportar todas las pestañas a CSV")
+    sub.add_argument("file")
+    sub.set_defaults(func=cmd_export)
+
+    sub = commands.add_parser("search", help="Buscar en todas las pestañas")
+    sub.add_argument("query")
+    sub.add_argument("--limit", type=int, default=100)
+    sub.add_argument("--show-passwords", action="store_true")
+    sub.set_defaults(func=cmd_search)
+
+    sub = commands.add_parser("storage", help="Formato de almacenamiento: un token por campo o uno por fila (compacto)")
+    sub.add_argument("format", choices=("fields", "sealed"))
+    sub.set_defaults(func=cmd_storage)
+
+    sub = commands.add_parser("agent", help="Desbloquear y atender consultas por un socket Unix (como ssh-agent)")
+    sub.add_argument("--timeout", type=int, default=agent.DEFAULT_IDLE_TIMEOUT, help="Segundos de inactividad antes de bloquear")
+    sub.add_argument("--socket", help=f"Ruta del socket (por defecto ${agent.SOCKET_ENV} o un directorio por usuario)")
+    sub.set_defaults(func=cmd_agent)
+
+    sub = commands.add_parser("lock", help="Detener el agente de desbloqueo")
+    sub.add_argument("--socket")
+    sub.set_defaults(func=None)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        if args.command == "lock":
+            cmd_lock(args)
+            return 0
+        agent_vault = open_agent_vault(args)
+        if agent_vault is not None:
+            args.func(agent_vault, args)
+            return 0
+        # DB and crypto are only imported when the vault is opened here
+        from app.vault import Vault
+        with Vault.open(read_password(args), args.db) as vault:
+            args.func(vault, args)
+    except (ValueError, OSError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    except EOFError:
+        print("Error: no master password given", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
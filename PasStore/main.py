@@ -1,5 +1,6 @@
 import tkinter as tk
 from app.data.database import DatabaseManager
+from app.utils import diagnostics
 from app.ui.login import LoginWindow
 
 __version__ = "1.2.3"
@@ -8,11 +9,14 @@ if __name__ == "__main__":
     # Ensure DB is initialized
     db = DatabaseManager()
     db.init_db()
+    # Optional instrumentation (settings key "diagnostics")
+    diagnostics.configure(db)
     
     # Start UI
     root = tk.Tk()
-    app = LoginWindow(root, app_version=__version__)
+    app = LoginWindow(root, app_version=__version__, db=db)
     root.mainloop()
+    db.close()
 
 
 # pyinstaller --noconsole --onefile --name="PasStore" --icon="icono.ico" --clean main.py 
@@ -0,0 +1,26 @@
+import os
+import sys
+import tempfile
+from app.data.database import DatabaseManager, HOT_QUERIES
+
+# Crea una base vacía con el esquema actual y revisa que las consultas
+# frecuentes sigan usando índices (EXPLAIN QUERY PLAN)
+db_path = os.path.join(tempfile.mkdtemp(), "plans.db")
+db = DatabaseManager(db_path)
+db.init_db()
+
+conn = db.get_connection()
+for name, query, params, covering in HOT_QUERIES:
+    plan = " | ".join(row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}", params))
+    print(f"{name}: {plan}")
+
+failures = db.check_query_plans()
+db.close()
+os.remove(db_path)
+
+if failures:
+    print("\n✗ Consultas sin índice:")
+    for name, plan in failures:
+        print(f"  {name}: {plan}")
+    sys.exit(1)
+print("\n✓ Todas las consultas frecuentes usan índices")